@@ -5,8 +5,6 @@ import time
 from typing import Any, Dict, Optional, List
 
 import azure.functions as func
-from azure.storage.queue import QueueClient
-from azure.storage.blob import BlobServiceClient
 
 from .services.conversation import (
     create_llm_client,
@@ -39,6 +37,9 @@ def _get_storage_clients() -> Dict[str, Any]:
         )
     if not conn_str:
         raise RuntimeError("Missing AzureWebJobsStorage connection string.")
+    # Imported on first use: loading the storage SDK is left out of worker cold start
+    from azure.storage.queue import QueueClient
+    from azure.storage.blob import BlobServiceClient
     return {
         "queue": QueueClient.from_connection_string(conn_str, queue_name=QUEUE_NAME),
         "blob": BlobServiceClient.from_connection_string(conn_str),
@@ -2,30 +2,53 @@ import os
 import time
 import uuid
 import json
+import re
 import logging
 import datetime
+import functools
+import threading
 from typing import Any, Dict, Optional, List, Tuple
 
 
+_LLM_CLIENTS: Dict[Tuple[Optional[str], ...], Any] = {}
+_LLM_CLIENTS_LOCK = threading.Lock()
+
+
 def create_llm_client():
+    """Return the process-wide LLM client for the current settings.
+
+    Clients are cached per configuration so warm invocations reuse their keep-alive connections.
+    """
+    azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+    azure_key = os.getenv("AZURE_OPENAI_KEY")
+    api_version = os.getenv("AZURE_OPENAI_API_VERSION")
+    openai_key = os.getenv("OPENAI_API_KEY")
+    key = (azure_endpoint, azure_key, api_version, openai_key)
+    client = _LLM_CLIENTS.get(key)
+    if client is not None:
+        return client
+
     try:
         from openai import AzureOpenAI, OpenAI
     except Exception as e:
         raise RuntimeError("The 'openai' package is required. Add it to requirements.txt and deploy.") from e
 
-    azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-    azure_key = os.getenv("AZURE_OPENAI_KEY")
-    if azure_endpoint and azure_key:
-        return AzureOpenAI(
-            azure_endpoint=azure_endpoint,
-            api_key=azure_key,
-            api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-        )
-
-    openai_key = os.getenv("OPENAI_API_KEY")
-    if not openai_key:
-        raise RuntimeError("Missing OPENAI_API_KEY or AZURE_OPENAI_* settings.")
-    return OpenAI(api_key=openai_key)
+    with _LLM_CLIENTS_LOCK:
+        client = _LLM_CLIENTS.get(key)
+        if client is not None:
+            return client
+        if azure_endpoint and azure_key:
+            client = AzureOpenAI(
+                azure_endpoint=azure_endpoint,
+                api_key=azure_key,
+                api_version=api_version,
+            )
+        else:
+            if not openai_key:
+                raise RuntimeError("Missing OPENAI_API_KEY or AZURE_OPENAI_* settings.")
+            client = OpenAI(api_key=openai_key)
+        _LLM_CLIENTS[key] = client
+    return client
 
 
 def _parse_reasoning_models() -> List[str]:
@@ -59,24 +82,58 @@ def orchestrator_models() -> dict:
     }
 
 
+# Tool-indicating keywords (French + English)
+_TOOL_KEYWORDS = (
+    "search", "find", "lookup", "web", "internet", "current", "latest", "news",
+    "recherche", "cherche", "trouve", "web", "internet", "actuel", "récent", "nouvelles",
+    "list", "show", "get", "retrieve", "fetch", "display",
+    "liste", "montre", "affiche", "récupère", "obtient",
+    "create", "init", "initialize", "setup", "configure",
+    "crée", "créer", "initialise", "initialiser", "configure",
+    "convert", "transform", "change", "modify",
+    "convertir", "transformer", "changer", "modifier",
+)
+
+# Include French markers so FR prompts can trigger reasoning automatically
+_DEEP_MARKERS = (
+    "plan",
+    "multi-step",
+    "derive",
+    "prove",
+    "why",
+    "strategy",
+    "chain of thought",
+    "plan d'action",
+    "multi-etapes",
+    "multi étapes",
+    "démontrer",
+    "demontrer",
+    "prouve",
+    "pourquoi",
+    "stratégie",
+    "strategie",
+    "raisonnement",
+    "chaine de raisonnement",
+    "chaîne de raisonnement",
+    "réfléchis",
+    "reflechis",
+    "pas à pas",
+    "pas a pas",
+    "analyse détaillée",
+    "explication détaillée",
+)
+
+# Each marker list is folded into one alternation so a prompt is scanned once, not once per marker
+_TOOL_KEYWORDS_RE = re.compile("|".join(re.escape(k) for k in dict.fromkeys(_TOOL_KEYWORDS)))
+_DEEP_MARKERS_RE = re.compile("|".join(re.escape(m) for m in _DEEP_MARKERS))
+
+
 def route_mode(prompt: str, has_tools: bool, constraints: dict, allowed_tools: Optional[List[str]] = None) -> str:
     # Check if prompt actually needs tools (not just if tools are available)
     text = (prompt or "").lower()
-    
-    # Tool-indicating keywords (French + English)
-    tool_keywords = [
-        "search", "find", "lookup", "web", "internet", "current", "latest", "news",
-        "recherche", "cherche", "trouve", "web", "internet", "actuel", "récent", "nouvelles",
-        "list", "show", "get", "retrieve", "fetch", "display",
-        "liste", "montre", "affiche", "récupère", "obtient",
-        "create", "init", "initialize", "setup", "configure",
-        "crée", "créer", "initialise", "initialiser", "configure",
-        "convert", "transform", "change", "modify",
-        "convertir", "transformer", "changer", "modifier"
-    ]
-    
+
     # Only select tools mode if caller allows tools AND prompt suggests tool usage
-    if has_tools and allowed_tools and any(keyword in text for keyword in tool_keywords):
+    if has_tools and allowed_tools and _TOOL_KEYWORDS_RE.search(text):
         return "tools"
 
     # Accept both camelCase and snake_case flags and flat boolean values
@@ -96,37 +153,7 @@ def route_mode(prompt: str, has_tools: bool, constraints: dict, allowed_tools: O
     except Exception:
         max_latency_ms = None
 
-    text = (prompt or "").lower()
-    # Include French markers so FR prompts can trigger reasoning automatically
-    deep_markers = (
-        "plan",
-        "multi-step",
-        "derive",
-        "prove",
-        "why",
-        "strategy",
-        "chain of thought",
-        "plan d'action",
-        "multi-etapes",
-        "multi étapes",
-        "démontrer",
-        "demontrer",
-        "prouve",
-        "pourquoi",
-        "stratégie",
-        "strategie",
-        "raisonnement",
-        "chaine de raisonnement",
-        "chaîne de raisonnement",
-        "réfléchis",
-        "reflechis",
-        "pas à pas",
-        "pas a pas",
-        "analyse détaillée",
-        "explication détaillée",
-    )
-
-    if prefer_reasoning or any(m in text for m in deep_markers) or len(prompt) > 800:
+    if prefer_reasoning or _DEEP_MARKERS_RE.search(text) or len(prompt) > 800:
         # If explicit latency budget is tight, downshift to standard
         if max_latency_ms is not None and max_latency_ms < 1500:
             return "standard"
@@ -584,6 +611,12 @@ def _load_system_prompt_markdown() -> str:
                         return text.replace("{{today}}", today)
         except Exception:
             pass
+    return _local_system_prompt(today)
+
+
+@functools.lru_cache(maxsize=8)
+def _local_system_prompt(today: str) -> str:
+    """Local file or built-in prompt for ``today``; neither changes while the worker runs."""
     # Local file next
     path = "system_prompt.md"
     try:
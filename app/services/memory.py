@@ -1,9 +1,17 @@
 import os
 import time
+import functools
 import logging
+import queue
 import re
 import json
-from typing import Any, Dict, List, Optional
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is used when missing
+    orjson = None
 
 _cosmos_client = None
 _cosmos_db = None
@@ -66,12 +74,50 @@ def _init_cosmos() -> None:
             raise
 
 
+class _ContainerNameTable(dict):
+    """str.translate table for container names, filled lazily per code point.
+
+    Alphanumerics (Unicode ``isalnum``), '-' and '_' map to themselves, anything else to '_'.
+    """
+
+    def __missing__(self, cp: int) -> int:
+        ch = chr(cp)
+        out = cp if ch.isalnum() or ch in ("-", "_") else ord("_")
+        self[cp] = out
+        return out
+
+
+_CONTAINER_NAME_TABLE = _ContainerNameTable()
+
+
+# Process-local and bounded: the same user ids come back on every request
+@functools.lru_cache(maxsize=4096)
 def _sanitize_container_name(raw_user_id: str) -> str:
     # Cosmos container name: letters, numbers, dash, underscore only, max 255
-    base = "mem_" + (raw_user_id or "unknown")
-    safe = ''.join(ch if ch.isalnum() or ch in (
-        '-', '_') else '_' for ch in base)
-    return safe[:255]
+    # (translation is one code point for one, so truncating first is equivalent)
+    base = ("mem_" + (raw_user_id or "unknown"))[:255]
+    return base.translate(_CONTAINER_NAME_TABLE)
+
+
+# str.translate table dropping every surrogate code point (U+D800..U+DFFF) in one C-level pass
+_SURROGATE_STRIP = dict.fromkeys(range(0xD800, 0xE000))
+
+# Malformed escape prefixes, fused into one alternation so the text is scanned once:
+# a backslash-u/x/U not followed by enough hex digits. A hand-rolled str.find() scanner was
+# measured against it and only won on escape-dense input; on ordinary text with paths or
+# valid escapes the regex is faster, and backslash-free text never reaches it.
+_RE_BAD_ESCAPE = re.compile(
+    r"\\(?:u(?![0-9a-fA-F]{4})|x(?![0-9a-fA-F]{2})|U(?![0-9a-fA-F]{8}))"
+)
+# Replacement template: the matched prefix preceded by two extra backslashes
+_DOUBLE_BACKSLASH = r"\\\\\g<0>"
+
+# Same prefixes, but only when the backslash is not itself escaped (used for diagnostics)
+_RE_SCAN_BAD_ESCAPES = (
+    re.compile(r"(?<!\\)\\u(?![0-9a-fA-F]{4})"),
+    re.compile(r"(?<!\\)\\x(?![0-9a-fA-F]{2})"),
+    re.compile(r"(?<!\\)\\U(?![0-9a-fA-F]{8})"),
+)
 
 
 def _sanitize_text_for_cosmos(raw: str) -> str:
@@ -89,23 +135,19 @@ def _sanitize_text_for_cosmos(raw: str) -> str:
     except Exception:
         return ""
 
-    # Remove surrogate code points which cannot appear in valid UTF-8
-    try:
-        text = "".join(ch for ch in text if not (0xD800 <= ord(ch) <= 0xDFFF))
-    except Exception:
-        pass
+    # Remove surrogate code points which cannot appear in valid UTF-8 (ASCII text has none)
+    if not text.isascii():
+        try:
+            text = text.translate(_SURROGATE_STRIP)
+        except Exception:
+            pass
 
     # Neutralise malformed escape prefixes by doubling the backslash
-    try:
-        patterns = [
-            r"\\u(?![0-9a-fA-F]{4})",
-            r"\\x(?![0-9a-fA-F]{2})",
-            r"\\U(?![0-9a-fA-F]{8})",
-        ]
-        for pat in patterns:
-            text = re.sub(pat, lambda m: "\\\\" + m.group(0), text)
-    except Exception:
-        pass
+    if "\\" in text:
+        try:
+            text = _RE_BAD_ESCAPE.sub(_DOUBLE_BACKSLASH, text)
+        except Exception:
+            pass
 
     return text
 
@@ -133,17 +175,14 @@ def _scan_invalid_escape_sequences(value: Any, path: str = "$") -> List[str]:
     issues: List[str] = []
     try:
         if isinstance(value, str):
-            patterns = [
-                r"(?<!\\)\\u(?![0-9a-fA-F]{4})",
-                r"(?<!\\)\\x(?![0-9a-fA-F]{2})",
-                r"(?<!\\)\\U(?![0-9a-fA-F]{8})",
-            ]
-            for pat in patterns:
-                if re.search(pat, value):
+            if "\\" not in value:
+                return issues
+            for rx in _RE_SCAN_BAD_ESCAPES:
+                if rx.search(value):
                     snippet = value
                     if len(snippet) > 80:
                         snippet = snippet[:77] + "…"
-                    issues.append(f"{path}: {pat} -> '{snippet}'")
+                    issues.append(f"{path}: {rx.pattern} -> '{snippet}'")
         elif isinstance(value, list):
             for i, v in enumerate(value):
                 issues.extend(
@@ -158,19 +197,82 @@ def _scan_invalid_escape_sequences(value: Any, path: str = "$") -> List[str]:
     return issues
 
 
+# A whole backslash run (escaped pairs, then one unescaped backslash) before u/U/x/X
+_RE_UNESCAPED_PREFIX = re.compile(r"(?<!\\)((?:\\\\)*)\\([uUxX])")
+
+
+def _double_escape_prefixes(value: str) -> str:
+    r"""Double every unescaped backslash that starts a ``\u``/``\U``/``\x``/``\X`` prefix.
+
+    A backslash is unescaped when it ends an odd run of backslashes; the run is matched from
+    its first backslash, so one regex pass with a plain template handles every string alike.
+    """
+    if "\\" not in value:
+        return value
+    return _RE_UNESCAPED_PREFIX.sub(r"\1\\\\\2", value)
+
+
+_BATCH_SEP = "\x1e"
+
+
+def _sanitize_json_in_place(root: Any) -> None:
+    """Sanitize every string of a freshly parsed JSON tree in place, walking it with an explicit stack.
+
+    Strings needing work are joined on an ASCII record separator and cleaned in a single
+    translate + regex pass, then split back; both passes leave the separator untouched.
+    """
+    slots: List[Tuple[Any, Any]] = []
+    parts: List[str] = []
+    stack = [root]
+    pop, push = stack.pop, stack.append
+    while stack:
+        node = pop()
+        items = node.items() if isinstance(node, dict) else enumerate(node)
+        for k, v in items:
+            if isinstance(v, str):
+                # Plain ASCII without a backslash is already safe
+                if not v.isascii() or "\\" in v:
+                    slots.append((node, k))
+                    parts.append(v)
+            elif isinstance(v, (dict, list)):
+                push(v)
+    if not parts:
+        return
+    if any(_BATCH_SEP in p for p in parts):
+        cleaned = [_sanitize_text_for_cosmos(p) for p in parts]
+    else:
+        cleaned = _sanitize_text_for_cosmos(_BATCH_SEP.join(parts)).split(_BATCH_SEP)
+    for (node, k), v in zip(slots, cleaned):
+        node[k] = v
+
+
+def _json_round_trip(value: Any) -> Any:
+    """Serialize and re-parse ``value``; orjson first, stdlib json for what orjson rejects (e.g. lone surrogates)."""
+    if orjson is not None:
+        try:
+            return orjson.loads(orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS))
+        except (TypeError, ValueError):
+            pass
+    return json.loads(json.dumps(value, ensure_ascii=False))
+
+
 def _final_cosmos_scrub(doc: Dict[str, Any]) -> Dict[str, Any]:
     r"""Minimal defensive scrub before sending to Cosmos.
 
-    We recursively sanitise all strings and ensure the resulting document can be
-    serialised to JSON.  No additional transformations are performed.
+    We ensure the document can be serialised to JSON and sanitise all strings of
+    the resulting copy in place.  No additional transformations are performed.
     """
     try:
-        sanitized = _sanitize_json_for_cosmos(doc)
         try:
-            raw_json = json.dumps(sanitized, ensure_ascii=False)
-            return json.loads(raw_json)
+            # The JSON round-trip yields a private copy, so its strings can be replaced in place
+            scrubbed = _json_round_trip(doc)
         except Exception:
-            return sanitized
+            return _sanitize_json_for_cosmos(doc)
+        if isinstance(scrubbed, (dict, list)):
+            _sanitize_json_in_place(scrubbed)
+        elif isinstance(scrubbed, str):
+            scrubbed = _sanitize_text_for_cosmos(scrubbed)
+        return scrubbed
     except Exception:
         return doc
 
@@ -204,13 +306,9 @@ def _derive_short_title_from_text(text: str, max_length: int = 60, max_words: in
         raw = (text or "").strip()
         if not raw:
             raise ValueError("empty text")
-        # Normalize whitespace and remove line breaks
-        normalized = " ".join(raw.replace(
-            "\n", " ").replace("\r", " ").split())
-        # Trim by words first
-        parts = normalized.split(" ")
-        if len(parts) > max_words:
-            normalized = " ".join(parts[:max_words])
+        # Normalize whitespace (line breaks included) and trim by words first;
+        # maxsplit leaves the rest of a long message as one unsplit tail
+        normalized = " ".join(raw.split(None, max_words)[:max_words])
         # Then trim by length
         if len(normalized) > max_length:
             normalized = normalized[: max(0, max_length - 1)].rstrip() + "…"
@@ -284,6 +382,8 @@ def get_conversation_messages(user_id: str, conversation_id: str, limit: int = 5
         raise ValueError("user_id is required")
     if not conversation_id:
         raise ValueError("conversation_id is required")
+    # Turns of this conversation may still sit in the background persistence queue
+    wait_for_conversation_turns(user_id, conversation_id)
     doc = get_memory(user_id, conversation_id)
     if not doc:
         return []
@@ -298,6 +398,13 @@ def upsert_conversation_turn(user_id: str, conversation_id: str, user_text: str,
     Creates the document if missing, using the provided conversation_id as the document id
     and storing it explicitly under the "conversation_id" field for querying.
     """
+    return _upsert_conversation_turns(user_id, conversation_id, [(user_text, assistant_text)])
+
+
+def _upsert_conversation_turns(
+    user_id: str, conversation_id: str, turns: List[Tuple[str, str]]
+) -> Dict[str, Any]:
+    """Append several (user_text, assistant_text) turns with a single read and a single upsert."""
     if not user_id:
         raise ValueError("user_id is required")
     if not conversation_id:
@@ -308,6 +415,7 @@ def upsert_conversation_turn(user_id: str, conversation_id: str, user_text: str,
     container = _get_user_container(user_id)
     t_after_container = time.perf_counter()
     now_iso = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    first_user_text = next((u for u, _ in turns if u), "")
     # Try to read existing doc by provided conversation_id
     doc = get_memory(user_id, conversation_id)
     t_after_read = time.perf_counter()
@@ -341,9 +449,9 @@ def upsert_conversation_turn(user_id: str, conversation_id: str, user_text: str,
         }
         # Seed title from the very first user input when creating the conversation
         try:
-            if user_text:
+            if first_user_text:
                 doc["title"] = _sanitize_text_for_cosmos(
-                    _derive_short_title_from_text(user_text))
+                    _derive_short_title_from_text(first_user_text))
         except Exception:
             pass
     else:
@@ -359,26 +467,27 @@ def upsert_conversation_turn(user_id: str, conversation_id: str, user_text: str,
                             source_text = src
                             break
                 # If still none, use current user_text
-                if not source_text and user_text:
-                    source_text = user_text
+                if not source_text and first_user_text:
+                    source_text = first_user_text
                 if source_text:
                     doc["title"] = _sanitize_text_for_cosmos(
                         _derive_short_title_from_text(source_text))
             except Exception:
                 pass
     # Append user and assistant messages
-    if user_text:
-        doc.setdefault("messages", []).append({
-            "role": "user",
-            "content": _sanitize_text_for_cosmos(user_text),
-            "timestamp": now_iso,
-        })
-    if assistant_text:
-        doc.setdefault("messages", []).append({
-            "role": "assistant",
-            "content": _sanitize_text_for_cosmos(assistant_text),
-            "timestamp": now_iso,
-        })
+    for user_text, assistant_text in turns:
+        if user_text:
+            doc.setdefault("messages", []).append({
+                "role": "user",
+                "content": _sanitize_text_for_cosmos(user_text),
+                "timestamp": now_iso,
+            })
+        if assistant_text:
+            doc.setdefault("messages", []).append({
+                "role": "assistant",
+                "content": _sanitize_text_for_cosmos(assistant_text),
+                "timestamp": now_iso,
+            })
     doc["updated_at"] = now_iso
     doc["updatedAt"] = now_iso
     # Ensure conversation_id property is present for query-based retrieval
@@ -399,7 +508,7 @@ def upsert_conversation_turn(user_id: str, conversation_id: str, user_text: str,
         try:
             def _aggressive(value: Any) -> Any:
                 if isinstance(value, str):
-                    return re.sub(r"(?<!\\)\\([uUxX])", r"\\\\\\1", value)
+                    return _double_escape_prefixes(value)
                 if isinstance(value, list):
                     return [_aggressive(v) for v in value]
                 if isinstance(value, dict):
@@ -477,6 +586,111 @@ def upsert_conversation_turn(user_id: str, conversation_id: str, user_text: str,
     return saved
 
 
+# Background persistence: request handlers enqueue turns and return immediately; a daemon
+# worker merges turns of the same conversation arriving within a short window into one upsert.
+# The queue lives in this worker process only: a queued turn is not durable until the worker
+# (or flush_conversation_turns()) has written it, is lost if the host recycles the process
+# first, and other scaled-out instances read the conversation without it in the meantime.
+_PERSIST_Q: "queue.Queue[Tuple[str, str, str, str]]" = queue.Queue()
+_PERSIST_COALESCE_SECONDS = 0.05
+# Queued-but-unwritten turn count per (user_id, conversation_id), so history reads can wait for them
+_PENDING_TURNS: Dict[Tuple[str, str], int] = {}
+_PENDING_TURNS_CV = threading.Condition()
+
+
+def _get_pending_turns_wait_seconds() -> float:
+    try:
+        return float(os.getenv("MEMORY_HISTORY_WAIT_SECONDS") or "10")
+    except ValueError:
+        return 10.0
+
+
+# How long a history read waits for this process's queued turns of the conversation
+_PENDING_TURNS_WAIT_SECONDS = _get_pending_turns_wait_seconds()
+_persist_worker: Optional[threading.Thread] = None
+_persist_worker_lock = threading.Lock()
+
+
+def enqueue_conversation_turn(user_id: str, conversation_id: str, user_text: str, assistant_text: str) -> None:
+    """Schedule upsert_conversation_turn() on the background worker without waiting for Cosmos.
+
+    The turn is only held in memory until the worker writes it; call flush_conversation_turns()
+    when it must be durable before going on.
+    """
+    global _persist_worker
+    if _persist_worker is None or not _persist_worker.is_alive():
+        with _persist_worker_lock:
+            if _persist_worker is None or not _persist_worker.is_alive():
+                _persist_worker = threading.Thread(
+                    target=_persist_worker_loop, name="cosmos-persist", daemon=True)
+                _persist_worker.start()
+    with _PENDING_TURNS_CV:
+        key = (user_id, conversation_id)
+        _PENDING_TURNS[key] = _PENDING_TURNS.get(key, 0) + 1
+    _PERSIST_Q.put_nowait((user_id, conversation_id, user_text, assistant_text))
+
+
+def flush_conversation_turns() -> None:
+    """Block until every queued turn has been written (or has failed)."""
+    _PERSIST_Q.join()
+
+
+def wait_for_conversation_turns(user_id: str, conversation_id: str, timeout: Optional[float] = None) -> bool:
+    """Block until the turns queued for this conversation have been written (or have failed).
+
+    Only turns queued by this process are seen. Returns False when ``timeout`` (default
+    ``MEMORY_HISTORY_WAIT_SECONDS``) expires first; the history read then misses those turns.
+    """
+    if timeout is None:
+        timeout = _PENDING_TURNS_WAIT_SECONDS
+    key = (user_id, conversation_id)
+    with _PENDING_TURNS_CV:
+        done = _PENDING_TURNS_CV.wait_for(lambda: key not in _PENDING_TURNS, timeout)
+        pending = _PENDING_TURNS.get(key, 0)
+    if not done:
+        logging.warning(
+            "Timed out after %.1fs waiting for %d queued turn(s) of conversation %s; history may be incomplete",
+            timeout, pending, conversation_id)
+    return done
+
+
+def _persist_worker_loop() -> None:
+    while True:
+        batch = [_PERSIST_Q.get()]
+        deadline = time.monotonic() + _PERSIST_COALESCE_SECONDS
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_PERSIST_Q.get(timeout=remaining))
+            except queue.Empty:
+                break
+        grouped: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        for user_id, conversation_id, user_text, assistant_text in batch:
+            grouped.setdefault((user_id, conversation_id), []).append((user_text, assistant_text))
+        for (user_id, conversation_id), turns in grouped.items():
+            try:
+                _upsert_conversation_turns(user_id, conversation_id, turns)
+            except Exception:
+                logging.exception(
+                    "Background conversation persistence failed: user_id=%s conversation_id=%s turns=%d",
+                    user_id,
+                    conversation_id,
+                    len(turns),
+                )
+            finally:
+                with _PENDING_TURNS_CV:
+                    left = _PENDING_TURNS.get((user_id, conversation_id), 0) - len(turns)
+                    if left > 0:
+                        _PENDING_TURNS[(user_id, conversation_id)] = left
+                    else:
+                        _PENDING_TURNS.pop((user_id, conversation_id), None)
+                    _PENDING_TURNS_CV.notify_all()
+        for _ in batch:
+            _PERSIST_Q.task_done()
+
+
 def get_next_memory_id(user_id: str) -> int:
     if not user_id:
         raise ValueError("user_id is required")
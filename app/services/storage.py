@@ -1,9 +1,90 @@
+import io
 import os
 import json
-from typing import Any, Dict, Optional
+import hashlib
+import functools
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
-from azure.storage.queue import QueueClient
-from azure.storage.blob import BlobServiceClient
+if TYPE_CHECKING:
+    from azure.storage.blob import BlobServiceClient
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is used when missing
+    orjson = None
+
+
+# Azure storage SDK classes, imported on first use so invocations that never touch storage
+# do not pay the package import at cold start
+_QueueClient = None
+_BlobServiceClient = None
+
+
+def _storage_classes():
+    global _QueueClient, _BlobServiceClient
+    if _QueueClient is None or _BlobServiceClient is None:
+        from azure.storage.queue import QueueClient
+        from azure.storage.blob import BlobServiceClient
+        _QueueClient, _BlobServiceClient = QueueClient, BlobServiceClient
+    return _QueueClient, _BlobServiceClient
+
+
+# SDK clients are thread-safe and hold the HTTP pipeline: build them once per connection string
+@functools.lru_cache(maxsize=32)
+def _queue_client(conn_str: str, queue_name: str):
+    return _storage_classes()[0].from_connection_string(conn_str, queue_name=queue_name)
+
+
+@functools.lru_cache(maxsize=8)
+def _blob_service(conn_str: str):
+    return _storage_classes()[1].from_connection_string(conn_str)
+
+
+# Below this size re-uploading is as cheap as the properties request needed to skip it
+_UPLOAD_SKIP_CHECK_MIN_BYTES = 64 * 1024
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize ``obj`` to canonical (sorted-keys) UTF-8 JSON bytes (orjson when available)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            # Lone surrogates or non-string keys: stdlib json accepts them
+            pass
+    try:
+        text = json.dumps(obj, ensure_ascii=False, sort_keys=True)
+    except TypeError:
+        # Mixed key types cannot be sorted
+        text = json.dumps(obj, ensure_ascii=False)
+    # backslashreplace writes lone surrogates as \uXXXX, which is a valid JSON escape
+    return text.encode("utf-8", "backslashreplace")
+
+
+def _upload_json(client: Any, obj: Any) -> None:
+    """Upload ``obj`` as JSON, tagging the blob with a content hash.
+
+    Large payloads whose hash matches the blob's current ``content_hash`` metadata are not sent again.
+    """
+    data = _dumps(obj)
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    if len(data) >= _UPLOAD_SKIP_CHECK_MIN_BYTES:
+        try:
+            if (client.get_blob_properties().metadata or {}).get("content_hash") == digest:
+                return
+        except Exception:
+            # Missing blob or transient error: just upload
+            pass
+    client.upload_blob(data, overwrite=True, metadata={"content_hash": digest})
+
+
+def _download_json(client: Any) -> Any:
+    """Download a blob straight into one buffer and parse it without an intermediate ``bytes`` copy."""
+    buf = io.BytesIO()
+    client.download_blob().readinto(buf)
+    if orjson is not None:
+        return orjson.loads(buf.getbuffer())
+    return json.loads(buf.getvalue())
 
 
 def get_storage_clients(queue_name: str = "mcpjobs") -> Dict[str, Any]:
@@ -26,32 +107,32 @@ def get_storage_clients(queue_name: str = "mcpjobs") -> Dict[str, Any]:
     if not conn_str:
         raise RuntimeError("Missing AzureWebJobsStorage connection string.")
     return {
-        "queue": QueueClient.from_connection_string(conn_str, queue_name=queue_name),
-        "blob": BlobServiceClient.from_connection_string(conn_str),
+        "queue": _queue_client(conn_str, queue_name),
+        "blob": _blob_service(conn_str),
         "container": os.getenv("MCP_JOBS_CONTAINER", "jobs"),
     }
 
 
-def upload_job_blob(blob_service: BlobServiceClient, container: str, job_id: str, payload: Dict[str, Any]) -> None:
+def upload_job_blob(blob_service: "BlobServiceClient", container: str, job_id: str, payload: Dict[str, Any]) -> None:
     client = blob_service.get_blob_client(container=container, blob=f"{job_id}.json")
-    client.upload_blob(json.dumps(payload, ensure_ascii=False), overwrite=True)
+    _upload_json(client, payload)
 
 
-def get_job_blob(blob_service: BlobServiceClient, container: str, job_id: str) -> Optional[Dict[str, Any]]:
+def get_job_blob(blob_service: "BlobServiceClient", container: str, job_id: str) -> Optional[Dict[str, Any]]:
     client = blob_service.get_blob_client(container=container, blob=f"{job_id}.json")
     if not client.exists():
         return None
-    return json.loads(client.download_blob().readall().decode("utf-8"))
+    return _download_json(client)
 
 
-def upload_sidecar_request(blob_service: BlobServiceClient, container: str, job_id: str, body: Dict[str, Any]) -> None:
+def upload_sidecar_request(blob_service: "BlobServiceClient", container: str, job_id: str, body: Dict[str, Any]) -> None:
     client = blob_service.get_blob_client(container=container, blob=f"{job_id}.req.json")
-    client.upload_blob(json.dumps(body, ensure_ascii=False), overwrite=True)
+    _upload_json(client, body)
 
 
-def get_sidecar_request(blob_service: BlobServiceClient, container: str, job_id: str) -> Optional[Dict[str, Any]]:
+def get_sidecar_request(blob_service: "BlobServiceClient", container: str, job_id: str) -> Optional[Dict[str, Any]]:
     client = blob_service.get_blob_client(container=container, blob=f"{job_id}.req.json")
     if not client.exists():
         return None
-    return json.loads(client.download_blob().readall().decode("utf-8"))
+    return _download_json(client)
 
@@ -1,29 +1,41 @@
 import os
 import json
+import threading
+import time
 from typing import Any, Dict, Optional, List, Tuple
 
 
+def _tool_names(values: List[Any]) -> List[str]:
+    # Strings (the common case) are kept as-is; numbers are stringified, anything else dropped
+    return [x if type(x) is str else str(x) for x in values if isinstance(x, (str, int, float))]
+
+
+def _parse_allowed_tools_text(text: str) -> Optional[List[str]]:
+    # Only a bracketed value can be a JSON list: comma-separated names never reach the JSON parser
+    if text.startswith("[") and text.endswith("]"):
+        return _tool_names(json.loads(text))
+    if "," in text:
+        return [p.strip() for p in text.split(",") if p.strip()]
+    return None
+
+
 def normalize_allowed_tools(raw_value: Any) -> Optional[List[str]]:
     try:
         if isinstance(raw_value, list):
             if len(raw_value) == 1 and isinstance(raw_value[0], str):
-                single = raw_value[0].strip()
-                if single.startswith("[") and single.endswith("]"):
-                    parsed = json.loads(single)
-                    return [str(x) for x in parsed if isinstance(x, (str, int, float))]
-                if "," in single:
-                    return [p.strip() for p in single.split(",") if p.strip()]
-            return [str(x) for x in raw_value if isinstance(x, (str, int, float))]
+                parsed = _parse_allowed_tools_text(raw_value[0].strip())
+                if parsed is not None:
+                    return parsed
+            return _tool_names(raw_value)
         if isinstance(raw_value, str):
             trimmed = raw_value.strip()
-            if trimmed.startswith("[") and trimmed.endswith("]"):
-                parsed = json.loads(trimmed)
-                return [str(x) for x in parsed if isinstance(x, (str, int, float))]
-            if "," in trimmed:
-                return [p.strip() for p in trimmed.split(",") if p.strip()]
+            parsed = _parse_allowed_tools_text(trimmed)
+            if parsed is not None:
+                return parsed
             if trimmed:
                 return [trimmed]
-    except Exception:
+    except ValueError:
+        # Malformed JSON list (json.JSONDecodeError is a ValueError)
         pass
     return None
 
@@ -186,6 +198,47 @@ def has_builtin_tools() -> bool:
     return len(get_builtin_tools_config()) > 0
 
 
+_HTTP_SESSION = None
+_HTTP_SESSION_LOCK = threading.Lock()
+
+# Transient backend failures (cold starts, throttling) are retried by urllib3 with
+# exponential backoff (0.5s, 1s, 2s...) honouring Retry-After.
+_HTTP_MAX_RETRIES = 3
+_HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def get_http_session():
+    """Process-wide ``requests.Session`` so backend calls reuse pooled keep-alive connections."""
+    global _HTTP_SESSION
+    if _HTTP_SESSION is None:
+        with _HTTP_SESSION_LOCK:
+            if _HTTP_SESSION is None:
+                import requests  # type: ignore
+                from requests.adapters import HTTPAdapter  # type: ignore
+                from urllib3.util.retry import Retry  # type: ignore
+
+                retry = Retry(
+                    total=_HTTP_MAX_RETRIES,
+                    # A read timeout already cost the full timeout; retrying it multiplies the wait
+                    read=0,
+                    backoff_factor=0.5,
+                    status_forcelist=_HTTP_RETRY_STATUSES,
+                    # Status codes are only retried for idempotent methods: POSTs
+                    # convert documents or create user spaces and must not run twice. urllib3 still
+                    # retries connection errors for every method, since nothing reached the backend.
+                    allowed_methods=frozenset({"GET", "HEAD"}),
+                    respect_retry_after_header=True,
+                    # Hand the last response back so callers keep reporting the backend error
+                    raise_on_status=False,
+                )
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _HTTP_SESSION = session
+    return _HTTP_SESSION
+
+
 def _call_websearch_backend(args: Dict[str, Any]) -> str:
     import logging
     url, key = _websearch_env()
@@ -257,24 +310,25 @@ def _call_websearch_backend(args: Dict[str, Any]) -> str:
         
         logging.info(f"[websearch] Sending POST request to {_redact_secrets(final_url)}")
         logging.info(f"[websearch] Form data: {form_data}")
-        resp = requests.post(final_url, headers=headers, data=form_data, timeout=30)
+        resp = get_http_session().post(final_url, headers=headers, data=form_data, timeout=30)
         logging.info(f"[websearch] Response status: {resp.status_code}")
-        text = resp.text or ""
-        logging.info(f"[websearch] Response text length: {len(text)}")
-        if len(text) < 300:
-            logging.info(f"[websearch] Response text: {text}")
+        # Log a preview decoded from the buffered bytes; the full body is decoded only if returned as text
+        content = resp.content or b""
+        logging.info(f"[websearch] Response length: {len(content)} bytes")
+        if len(content) < 300:
+            logging.info(f"[websearch] Response text: {content.decode('utf-8', errors='replace')}")
         else:
-            logging.info(f"[websearch] Response text (truncated): {text[:250]}...")
+            logging.info(f"[websearch] Response text (truncated): {content[:250].decode('utf-8', errors='replace')}...")
             
         try:
-            data = resp.json()
+            data = json.loads(content)
             logging.info(f"[websearch] Response JSON parsed successfully. Keys: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}")
         except Exception as e:
             logging.warning(f"[websearch] Failed to parse JSON response: {e}")
             data = None
             
         if resp.status_code >= 400:
-            safe_text = _redact_secrets(text)
+            safe_text = _redact_secrets(resp.text or "")
             logging.error(f"[websearch] HTTP error {resp.status_code}: {safe_text[:200]}")
             return f"websearch error {resp.status_code}: {safe_text[:500]}"
         # Prefer structured fields when available
@@ -296,7 +350,8 @@ def _call_websearch_backend(args: Dict[str, Any]) -> str:
                 return fallback_result
             except Exception:
                 logging.warning("[websearch] Failed to serialize response JSON, returning raw text")
-                return text
+                return resp.text or ""
+        text = resp.text or ""
         if not text.strip():
             logging.warning("[websearch] No text content in response")
             return "No search results returned by the websearch service."
@@ -390,7 +445,9 @@ def _docsvc_build_url(path_template: str, path_params: Optional[Dict[str, str]]
         else:
             base = f"https://{base}"
     base = base.rstrip("/")
-    path = path_template.format(**(path_params or {}))
+    # Every current caller passes a literal path: only run str.format when there is something to substitute
+    # (this also keeps braces in a literal path, e.g. a blob name, from being parsed as fields)
+    path = path_template.format(**path_params) if path_params else path_template
     if not path.startswith("/"):
         path = "/" + path
     final_url = f"{base}{path}"
@@ -400,26 +457,81 @@ def _docsvc_build_url(path_template: str, path_params: Optional[Dict[str, str]]
     return final_url
 
 
+class _Breaker:
+    """Consecutive-failure circuit breaker: opens after ``threshold`` failures, lets one probe through after ``cooloff`` seconds."""
+
+    def __init__(self, threshold: int = 3, cooloff: float = 30.0):
+        self.threshold = threshold
+        self.cooloff = cooloff
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooloff:
+                self.state = "half_open"
+                return True
+            # Still cooling off, or the half-open probe is in flight
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+# Once a document service endpoint is down, fail fast instead of paying retries + timeout per tool call.
+# One breaker per endpoint so a failing route does not block the healthy ones.
+_DOCSVC_BREAKERS: Dict[str, _Breaker] = {}
+_DOCSVC_BREAKERS_LOCK = threading.Lock()
+# Only gateway/availability errors mean the backend is down; a plain 500 is usually bad input
+_DOCSVC_BREAKER_STATUSES = (502, 503, 504)
+
+
+def _docsvc_breaker(path_template: str) -> _Breaker:
+    key = (path_template or "").split("?", 1)[0]
+    with _DOCSVC_BREAKERS_LOCK:
+        breaker = _DOCSVC_BREAKERS.get(key)
+        if breaker is None:
+            breaker = _DOCSVC_BREAKERS[key] = _Breaker()
+        return breaker
+
+
 def _docsvc_request(method: str, path_template: str, *, path_params: Optional[Dict[str, str]] = None, json_body: Optional[Dict[str, Any]] = None, timeout: int = 60) -> str:
     url = _docsvc_build_url(path_template, path_params)
     if not url:
         return "Document service backend not configured. Set DOCSVC_BASE_URL."
-    try:
-        import requests  # type: ignore
-    except Exception as e:
-        return f"requests import failed: {e}"
+    method_upper = (method or "GET").upper()
+    if method_upper not in ("GET", "POST"):
+        return f"Unsupported method: {method}"
+    breaker = _docsvc_breaker(path_template)
+    if not breaker.allow():
+        return "Document service temporarily unavailable (circuit open), retry later."
     try:
         headers = {"Content-Type": "application/json"}
-        method_upper = (method or "GET").upper()
+        session = get_http_session()
         if method_upper == "GET":
             if json_body:
-                resp = requests.get(url, json=json_body, headers=headers, timeout=timeout)
+                resp = session.get(url, json=json_body, headers=headers, timeout=timeout)
             else:
-                resp = requests.get(url, headers=headers, timeout=timeout)
-        elif method_upper == "POST":
-            resp = requests.post(url, headers=headers, data=json.dumps(json_body or {}), timeout=timeout)
+                resp = session.get(url, headers=headers, timeout=timeout)
+        else:
+            resp = session.post(url, headers=headers, data=json.dumps(json_body or {}), timeout=timeout)
+        if resp.status_code in _DOCSVC_BREAKER_STATUSES:
+            breaker.record_failure()
         else:
-            return f"Unsupported method: {method}"
+            breaker.record_success()
         text = resp.text or ""
         try:
             data = resp.json()
@@ -440,6 +552,7 @@ def _docsvc_request(method: str, path_template: str, *, path_params: Optional[Di
                 return text
         return _redact_secrets(text)
     except Exception as e:
+        breaker.record_failure()
         return f"docsvc call failed: {_redact_secrets(str(e))}"
 
 
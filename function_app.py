@@ -1,17 +1,24 @@
+import functools
+import hashlib
 import json
 import logging
 import os
+import threading
 import time
 import uuid
-import requests
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional, List
 import azure.functions as func
 from openai import AzureOpenAI
+from openai.types.chat import ChatCompletionMessage, ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion_message_tool_call import Function as ToolCallFunction
 from app.services.memory import upsert_memory as cosmos_upsert_memory
 from app.services.memory import list_conversation_docs as cosmos_list_conversation_docs
 from app.services.memory import list_memories as cosmos_list_memories
 from app.services.memory import get_conversation_messages as cosmos_get_conversation_messages
 from app.services.memory import upsert_conversation_turn as cosmos_upsert_conversation_turn
+from app.services.memory import enqueue_conversation_turn as cosmos_enqueue_conversation_turn
 from app.services.memory import get_next_memory_id as cosmos_get_next_memory_id
 from app.services.tools import (
     resolve_mcp_config,
@@ -19,6 +26,7 @@ from app.services.tools import (
     normalize_allowed_tools,
     get_builtin_tools_config,
     execute_tool_call,
+    get_http_session,
     _websearch_env,
 )
 from app.services.conversation import (
@@ -28,9 +36,31 @@ from app.services.conversation import (
     run_with_optional_stream,
     orchestrator_models,
     route_mode,
+    _supports_reasoning,
 )
 from app.services.storage import get_storage_clients, get_sidecar_request
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is used when missing
+    orjson = None
+
+# Per-request settings of the tool-test endpoints, read once: the Functions host restarts the
+# worker whenever app settings change, so they cannot go stale.
+_DOCSVC_BASE_URL = (os.getenv("DOCSVC_BASE_URL") or "").rstrip("/")
+_DOCSVC_FUNCTION_KEY = os.getenv("DOCSVC_FUNCTION_KEY", "")
+
+
+def _get_docsvc_timeout_seconds() -> float:
+    try:
+        return float(os.getenv("DOCSVC_TIMEOUT_SECONDS") or "20")
+    except ValueError:
+        return 20.0
+
+
+_DOCSVC_TIMEOUT_SECONDS = _get_docsvc_timeout_seconds()
+_AOAI_MODEL = os.getenv("AZURE_OPENAI_MODEL", "gpt-4o")
+
 app = func.FunctionApp(http_auth_level=func.AuthLevel.FUNCTION)
 
 # Register MCP endpoints via Blueprint
@@ -48,6 +78,242 @@ except Exception as e:
     logging.warning(f"MCP worker blueprint not registered: {e}")
 
 
+def _dumps(obj) -> bytes:
+    """Serialize ``obj`` to UTF-8 JSON bytes (orjson when available).
+
+    orjson rejects lone surrogates and non-string dict keys; those payloads go through stdlib
+    json, with surrogates escaped as ``\\uXXXX`` since they cannot be encoded to UTF-8.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass
+    try:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    except UnicodeEncodeError:
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(data: bytes):
+    """Parse JSON from raw response bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps_with_raw(obj: dict, key: str, raw: bytes) -> bytes:
+    """Serialize ``obj`` plus a trailing ``key`` whose value ``raw`` is already JSON bytes.
+
+    Lets handlers forward a (possibly large) backend body without decoding and re-encoding it.
+    """
+    head = _dumps(obj)[:-1]
+    sep = b"," if obj else b""
+    return head + sep + _dumps(key) + b":" + raw + b"}"
+
+
+# In-process LRU+TTL cache for the idempotent *_test endpoints (same prompt/model/tools => same answer)
+_TOOL_TEST_CACHE: "OrderedDict[bytes, tuple]" = OrderedDict()
+_TOOL_TEST_CACHE_LOCK = threading.Lock()
+_TOOL_TEST_CACHE_MAXSIZE = 512
+_TOOL_TEST_CACHE_TTL_SECONDS = 300.0
+
+# Output caps for the short post-tool synthesis calls (answers are one or two sentences)
+_SUMMARY_MAX_OUTPUT_TOKENS = 60
+_TOOL_FOLLOW_UP_MAX_TOKENS = 120
+
+# Tool results fed back to the model: past this size only a sample of the items is sent
+_TOOL_CONTENT_MAX_BYTES = 8192
+_TOOL_CONTENT_SAMPLE_ITEMS = 20
+
+
+def _tool_message_content(data) -> str:
+    """Compact JSON for a tool message, at most ``_TOOL_CONTENT_MAX_BYTES``.
+
+    Oversize ``items`` lists are cut to a sample plus ``_truncated_total``; whatever is still too
+    large is cut at the byte limit.
+    """
+    raw = _dumps(data)
+    if len(raw) > _TOOL_CONTENT_MAX_BYTES and isinstance(data, dict) and isinstance(data.get("items"), list):
+        items = data["items"]
+        if len(items) > _TOOL_CONTENT_SAMPLE_ITEMS:
+            raw = _dumps({**data, "items": items[:_TOOL_CONTENT_SAMPLE_ITEMS], "_truncated_total": len(items)})
+    if len(raw) > _TOOL_CONTENT_MAX_BYTES:
+        # Cut on a UTF-8 boundary: the model gets a readable prefix rather than nothing
+        return raw[:_TOOL_CONTENT_MAX_BYTES].decode("utf-8", "ignore")
+    return raw.decode("utf-8")
+
+
+def _tool_body_content(raw: bytes) -> str:
+    """Tool message content for a backend body that is already JSON bytes: passed through when small enough."""
+    if len(raw) <= _TOOL_CONTENT_MAX_BYTES:
+        return raw.decode("utf-8")
+    try:
+        return _tool_message_content(_loads(raw))
+    except ValueError:
+        return raw[:_TOOL_CONTENT_MAX_BYTES].decode("utf-8", "ignore")
+
+
+def _follow_up_token_cap(model: str) -> dict:
+    """Output cap for the post-tool follow-up call.
+
+    Reasoning deployments reject ``max_tokens`` and spend part of any budget on hidden
+    reasoning, so like the orchestrate summary they get no cap.
+    """
+    if _supports_reasoning(model):
+        return {}
+    return {"max_tokens": _TOOL_FOLLOW_UP_MAX_TOKENS}
+
+
+def _tool_test_cache_key(model, messages, tools) -> bytes:
+    names = []
+    for t in tools or []:
+        fn = t.get("function") or {}
+        names.append(fn.get("name") or t.get("name") or t.get("allowed_tools"))
+    raw = json.dumps({"m": model, "msgs": messages, "tools": names}, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest()
+
+
+def _tool_test_cache_get(key: bytes) -> Optional[bytes]:
+    with _TOOL_TEST_CACHE_LOCK:
+        entry = _TOOL_TEST_CACHE.get(key)
+        if entry is None:
+            return None
+        expires_at, body = entry
+        if expires_at < time.monotonic():
+            del _TOOL_TEST_CACHE[key]
+            return None
+        _TOOL_TEST_CACHE.move_to_end(key)
+        return body
+
+
+def _tool_test_cache_put(key: bytes, body: bytes) -> None:
+    with _TOOL_TEST_CACHE_LOCK:
+        _TOOL_TEST_CACHE[key] = (time.monotonic() + _TOOL_TEST_CACHE_TTL_SECONDS, body)
+        _TOOL_TEST_CACHE.move_to_end(key)
+        while len(_TOOL_TEST_CACHE) > _TOOL_TEST_CACHE_MAXSIZE:
+            _TOOL_TEST_CACHE.popitem(last=False)
+
+
+# Static prefix shared by every *_test call so the provider-side prompt cache can reuse it;
+# per-request parameters go into the trailing user message.
+_TOOL_TEST_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": (
+        "You are the document service assistant. Call the provided tool when the request needs it. "
+        "Parameters listed after the user's request are authoritative tool arguments."
+    ),
+}
+
+
+def _tool_test_messages(prompt: str, **params) -> List[dict]:
+    lines = [f"{k}={v}" for k, v in params.items() if v is not None]
+    content = prompt + "\n\n" + "\n".join(lines) if lines else prompt
+    return [_TOOL_TEST_SYSTEM_MESSAGE, {"role": "user", "content": content}]
+
+
+# Backend requests of the *_test handlers start on this pool while the model is still streaming
+_TOOL_TEST_BACKEND_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tool-test-backend")
+
+
+def _stream_tool_choice(client, model, messages, tools, dispatch) -> tuple:
+    """Run the tool-choosing completion with ``stream=True`` and start the backend call early.
+
+    As soon as the arguments of the first tool call form complete JSON, ``dispatch(args)`` is
+    submitted to the backend pool so the request overlaps the end of the stream.
+    Returns ``(message, args, future)``; ``args`` is the parsed argument dict handed to
+    ``dispatch`` and both are None when the model did not call a tool.
+    """
+    content_parts: List[str] = []
+    calls: dict = {}
+    args = None
+    future: Optional[Future] = None
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        tools=tools,
+        tool_choice="auto",
+        stream=True,
+    )
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            content_parts.append(delta.content)
+        for tc in delta.tool_calls or []:
+            call = calls.setdefault(tc.index, {"id": None, "name": "", "arguments": ""})
+            if tc.id:
+                call["id"] = tc.id
+            if tc.function is not None:
+                call["name"] += tc.function.name or ""
+                call["arguments"] += tc.function.arguments or ""
+        if future is None and calls:
+            try:
+                args = json.loads(calls[min(calls)]["arguments"])
+            except ValueError:
+                continue
+            if not isinstance(args, dict):
+                args = {}
+            future = _TOOL_TEST_BACKEND_POOL.submit(dispatch, args)
+    if future is None and calls:
+        # Arguments never formed valid JSON: dispatch without them, like the non-streaming handlers did
+        args = {}
+        future = _TOOL_TEST_BACKEND_POOL.submit(dispatch, args)
+    tool_calls = [
+        ChatCompletionMessageToolCall(
+            id=c["id"],
+            type="function",
+            function=ToolCallFunction(name=c["name"], arguments=c["arguments"]),
+        )
+        for _, c in sorted(calls.items())
+    ]
+    message = ChatCompletionMessage(
+        role="assistant",
+        content="".join(content_parts) or None,
+        tool_calls=tool_calls or None,
+    )
+    return message, args, future
+
+
+def _attach_tools(payload: dict, response) -> None:
+    """Copy the classic tools recorded on ``response`` into ``payload["tool_used"]``."""
+    used_tools = getattr(response, "_classic_tools_used", None)
+    if used_tools:
+        payload["tool_used"] = used_tools
+
+
+_EMPTY_ANSWER_BODY = b'{"answer":""}'
+
+
+def _answer_body(response) -> bytes:
+    """``{"answer": output_text}`` as JSON bytes; an empty answer reuses a pre-encoded body."""
+    answer = getattr(response, "output_text", None)
+    return _dumps({"answer": answer}) if answer else _EMPTY_ANSWER_BODY
+
+
+def _responses_call_succeeded(response) -> bool:
+    """True when a Responses API call completed and none of its MCP tool calls reported an error."""
+    if getattr(response, "status", None) not in (None, "completed"):
+        return False
+    for item in getattr(response, "output", None) or []:
+        if getattr(item, "type", None) == "mcp_call" and getattr(item, "error", None):
+            return False
+    return True
+
+
+def _quick_answer(client, responses_args: dict) -> tuple:
+    """Single Responses API call without any tool handling; returns ``(response, output_text)``."""
+    response = client.responses.create(**responses_args)
+    return response, getattr(response, "output_text", None) or ""
+
+
+# One client per configuration, shared across invocations of a warm instance so its pooled
+# keep-alive connections to the model endpoint are reused instead of redoing TCP+TLS each time.
+_AOAI_CLIENTS: dict = {}
+_AOAI_CLIENTS_LOCK = threading.Lock()
+
+
 def _get_aoai_client() -> AzureOpenAI:
     endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
     api_key = os.getenv("AZURE_OPENAI_KEY")
@@ -56,7 +322,15 @@ def _get_aoai_client() -> AzureOpenAI:
         raise RuntimeError("Missing AZURE_OPENAI_ENDPOINT")
     if not api_key:
         raise RuntimeError("Missing AZURE_OPENAI_KEY for local SDK calls")
-    return AzureOpenAI(azure_endpoint=endpoint, api_key=api_key, api_version=api_version)
+    key = (endpoint, api_key, api_version)
+    client = _AOAI_CLIENTS.get(key)
+    if client is None:
+        with _AOAI_CLIENTS_LOCK:
+            client = _AOAI_CLIENTS.get(key)
+            if client is None:
+                client = AzureOpenAI(azure_endpoint=endpoint, api_key=api_key, api_version=api_version)
+                _AOAI_CLIENTS[key] = client
+    return client
 
 
 # Health route per template rules
@@ -143,21 +417,21 @@ def list_models(req: func.HttpRequest) -> func.HttpResponse:
         return func.HttpResponse(json.dumps({"error": str(e)}, ensure_ascii=False), status_code=500, mimetype="application/json")
 
 
-def _build_search_web_tool_def():
-    return {
-        "type": "function",
-        "function": {
-            "name": "search_web",
-            "description": "Perform a web search via Azure Function (SearXNG).",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string", "description": "Search query"}
-                },
-                "required": ["query"],
+_SEARCH_WEB_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "search_web",
+        "description": "Perform a web search via Azure Function (SearXNG).",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "Search query"}
             },
+            "required": ["query"],
         },
-    }
+    },
+}
+_SEARCH_WEB_TOOLS = [_SEARCH_WEB_TOOL]
 
 # Simple endpoint demonstrating automatic use of the `search_web` tool
 @app.function_name("websearch_test")
@@ -183,7 +457,7 @@ def websearch_test(req: func.HttpRequest) -> func.HttpResponse:
     messages = [{"role": "user", "content": prompt}]
 
     # Tool unique
-    tools = [_build_search_web_tool_def()]
+    tools = _SEARCH_WEB_TOOLS
 
     try:
         # Premier appel : voir si le modèle déclenche la tool
@@ -217,7 +491,7 @@ def websearch_test(req: func.HttpRequest) -> func.HttpResponse:
                     sep = "&" if ("?" in url) else "?"
                     final_url = f"{url}{sep}code={key}"
                 try:
-                    resp = requests.post(
+                    resp = get_http_session().post(
                         final_url,
                         headers={"Content-Type": "application/json"},
                         json=tool_payload,
@@ -233,16 +507,15 @@ def websearch_test(req: func.HttpRequest) -> func.HttpResponse:
                 tool_result = {"error": "Websearch backend not configured."}
 
             # On boucle en envoyant la réponse tool
+            messages.append(msg)
+            messages.append({
+                "role": "tool",
+                "tool_call_id": tc.id,
+                "content": _tool_message_content(tool_result),
+            })
             follow_up = client.chat.completions.create(
                 model=model,
-                messages=messages + [
-                    msg,
-                    {
-                        "role": "tool",
-                        "tool_call_id": tc.id,
-                        "content": json.dumps(tool_result),
-                    },
-                ],
+                messages=messages,
             )
             result["answer"] = follow_up.choices[0].message.content
 
@@ -718,12 +991,7 @@ def ask(req: func.HttpRequest) -> func.HttpResponse:
             logging.exception(f"Persist failed: {e}")
         payload = {"output_text": output_text, "model": model, "duration_ms": duration_ms}
         # Expose classic tool usage when available
-        try:
-            used_tools = getattr(response, "_classic_tools_used", None)
-            if isinstance(used_tools, list) and used_tools:
-                payload["tool_used"] = used_tools
-        except Exception:
-            pass
+        _attach_tools(payload, response)
         # Echo reasoning effort if present in request
         try:
             req_effort = body.get("reasoning_effort") if isinstance(body, dict) else None
@@ -746,7 +1014,6 @@ def ask(req: func.HttpRequest) -> func.HttpResponse:
         return func.HttpResponse(json.dumps({"error": str(e)}, ensure_ascii=False), status_code=500, mimetype="application/json")
 
 
-
 # Orchestrate endpoint: choose model/reasoning, optionally execute
 @app.function_name("orchestrate")
 @app.route(route="orchestrate", methods=["POST"])
@@ -759,7 +1026,7 @@ def orchestrate(req: func.HttpRequest) -> func.HttpResponse:
         qp = getattr(req, 'params', {}) or {}
         prompt = (body.get("prompt") or qp.get("prompt") or "") if isinstance(body, dict) else (qp.get("prompt") or "")
         if not prompt:
-            return func.HttpResponse(json.dumps({"error": "Missing 'prompt'"}, ensure_ascii=False), status_code=400, mimetype="application/json")
+            return func.HttpResponse(_dumps({"error": "Missing 'prompt'"}), status_code=400, mimetype="application/json")
 
         execute = str((body.get("execute") if isinstance(body, dict) else qp.get("execute")) or "true").lower() in ("1", "true", "yes", "on")
         constraints = body.get("constraints") if isinstance(body, dict) and isinstance(body.get("constraints"), dict) else {}
@@ -815,7 +1082,7 @@ def orchestrate(req: func.HttpRequest) -> func.HttpResponse:
         # No memory persistence for orchestrator decisions (by design)
 
         if not execute:
-            return func.HttpResponse(json.dumps(decision_payload, ensure_ascii=False), mimetype="application/json")
+            return func.HttpResponse(_dumps(decision_payload), mimetype="application/json")
 
         # Execute using AOAI directly or with tools via Responses API
         client = _get_aoai_client()
@@ -899,9 +1166,11 @@ def orchestrate(req: func.HttpRequest) -> func.HttpResponse:
             else:
                 # No history: keep input minimal; do not inject system message to avoid forcing language
                 responses_args["input"] = [{"role": "user", "content": [{"type": "input_text", "text": prompt}]}]
+            # Without configured tools there is nothing to filter, pre-execute or loop over
+            has_tools = bool(responses_args.get("tools"))
             # Drop web search unless explicitly allowed
             try:
-                if not (isinstance(normalized_tools, list) and ("*" in normalized_tools or "search_web" in normalized_tools)):
+                if has_tools and not (isinstance(normalized_tools, list) and ("*" in normalized_tools or "search_web" in normalized_tools)):
                     if responses_args.get("tools"):
                         responses_args["tools"] = [
                             t
@@ -912,7 +1181,7 @@ def orchestrate(req: func.HttpRequest) -> func.HttpResponse:
                 pass
             # If caller restricted allowed_tools, filter classic tools accordingly and optionally force a single tool
             try:
-                if isinstance(normalized_tools, list) and responses_args.get("tools"):
+                if has_tools and isinstance(normalized_tools, list) and responses_args.get("tools"):
                     filtered_tools = []
                     classic_names: List[str] = []
                     for t in responses_args["tools"]:
@@ -938,7 +1207,7 @@ def orchestrate(req: func.HttpRequest) -> func.HttpResponse:
                 pass
             # Optional pre-execution when a single classic tool is allowed
             try:
-                if isinstance(normalized_tools, list) and responses_args.get("tools"):
+                if has_tools and isinstance(normalized_tools, list) and responses_args.get("tools"):
                     # Identify remaining classic tools after filtering
                     remaining_classics = [
                         (t.get("name") or t.get("function", {}).get("name"))
@@ -967,25 +1236,19 @@ def orchestrate(req: func.HttpRequest) -> func.HttpResponse:
                                         {"role": "system", "content": [{"type": "input_text", "text": system_msg}]},
                                         {"role": "user", "content": [{"type": "input_text", "text": summary_prompt}]},
                                     ],
-                                    "text": {"format": {"type": "text"}, "verbosity": "medium"},
+                                    "text": {"format": {"type": "text"}, "verbosity": "low"},
                                     "store": False,
                                 }
+                                # Reasoning tokens count against max_output_tokens: only cap plain models
+                                if not _supports_reasoning(selected_model):
+                                    args2["max_output_tokens"] = _SUMMARY_MAX_OUTPUT_TOKENS
                                 final_resp = client.responses.create(**args2)
                                 final_text = getattr(final_resp, "output_text", None) or ""
                                 if final_text.strip():
                                     output_text = final_text
                                     response = final_resp
-                                    try:
-                                        setattr(response, "_classic_tools_used", [{"name": "convert_word_to_pdf", "arguments": {"blob": blob_path}, "type": "classic", "direct": True}])
-                                    except Exception:
-                                        pass
+                                    response._classic_tools_used = [{"name": "convert_word_to_pdf", "arguments": {"blob": blob_path}, "type": "classic", "direct": True}]
                                     duration_ms = int((time.perf_counter() - started) * 1000)
-                                    # Persist if applicable
-                                    try:
-                                        if user_id and conversation_id:
-                                            cosmos_upsert_conversation_turn(user_id, conversation_id, prompt, output_text)
-                                    except Exception:
-                                        pass
                                     # Build payload similar to normal flow
                                     payload = {
                                         **decision_payload,
@@ -994,18 +1257,13 @@ def orchestrate(req: func.HttpRequest) -> func.HttpResponse:
                                         "conversation_id": conversation_id,
                                         "new_conversation": orig_missing_conversation_id,
                                     }
-                                    try:
-                                        used_tools = getattr(response, "_classic_tools_used", None)
-                                        if isinstance(used_tools, list) and used_tools:
-                                            payload["tool_used"] = used_tools
-                                    except Exception:
-                                        pass
-                                    resp = func.HttpResponse(json.dumps(payload, ensure_ascii=False), mimetype="application/json")
-                                    try:
-                                        if user_id and conversation_id:
-                                            resp.headers["X-Conversation-Id"] = conversation_id
-                                    except Exception:
-                                        pass
+                                    _attach_tools(payload, response)
+                                    resp = func.HttpResponse(_dumps(payload), mimetype="application/json")
+                                    if user_id and conversation_id:
+                                        resp.headers["X-Conversation-Id"] = conversation_id
+                                    # Persist if applicable
+                                    if user_id and conversation_id:
+                                        _persist_orchestrate_turn(user_id, conversation_id, prompt, output_text, orig_missing_conversation_id)
                                     return resp
             except Exception:
                 pass
@@ -1021,13 +1279,13 @@ def orchestrate(req: func.HttpRequest) -> func.HttpResponse:
                     text = " ".join([p.get("text", "") for p in content_parts if isinstance(p, dict) and p.get("type") == "input_text"])
                     if text.strip():
                         messages.append({"role": role, "content": text})
-                
+            
                 # Add user_id as system message for tools that require it
                 tools_needing_user_id = {"list_images", "init_user", "list_templates_http"}
                 tool_names = {tool.get("name", "") for tool in tools}
                 if user_id and any(tool_name in tools_needing_user_id for tool_name in tool_names):
                     messages.append({"role": "system", "content": f"user_id={user_id}"})
-                
+            
                 # Use same tools format as websearch-test
                 tools = responses_args["tools"]
                 # Ensure tools have correct format for Chat Completions API
@@ -1040,9 +1298,9 @@ def orchestrate(req: func.HttpRequest) -> func.HttpResponse:
                             "parameters": tool.get("parameters")
                         }
                 model = responses_args.get("model", "gpt-4.1-mini")
-                
+            
 
-                
+            
                 # First call - see if model triggers tools
                 resp = client.chat.completions.create(
                     model=model,
@@ -1052,10 +1310,10 @@ def orchestrate(req: func.HttpRequest) -> func.HttpResponse:
                 )
                 msg = resp.choices[0].message
                 output_text = ""  # Will be set by follow-up call if tools are used
-                
+            
                 # Track used tools for response metadata
                 used_tools = []
-                
+            
                 if msg.tool_calls:
                     # Model requested tools - execute ALL of them like websearch-test
                     tool_messages = []
@@ -1065,10 +1323,10 @@ def orchestrate(req: func.HttpRequest) -> func.HttpResponse:
                             args = json.loads(tc.function.arguments or "{}")
                         except Exception:
                             args = {}
-                        
+                    
                         # Execute the tool
                         tool_result = execute_tool_call(tool_name, args, tool_context)
-                        
+                    
                         # Track for metadata
                         used_tools.append({
                             "name": tool_name,
@@ -1076,14 +1334,14 @@ def orchestrate(req: func.HttpRequest) -> func.HttpResponse:
                             "type": "classic",
                             "direct": True
                         })
-                        
+                    
                         # Add tool response message
                         tool_messages.append({
                             "role": "tool",
                             "tool_call_id": tc.id,
                             "content": tool_result,
                         })
-                    
+                
                     # Second call with ALL tool results
                     follow_up = client.chat.completions.create(
                         model=model,
@@ -1094,14 +1352,14 @@ def orchestrate(req: func.HttpRequest) -> func.HttpResponse:
                 else:
                     # No tools called, use the original response
                     output_text = msg.content or ""
-                
+            
                 # Create mock response object for compatibility
                 class MockResponse:
                     def __init__(self, text, tools):
                         self.output_text = text
                         self._classic_tools_used = tools
                         self.tool_used = tools
-                
+            
                 response = MockResponse(output_text, used_tools)
                 # Fallback: if no textual output, retry once without tools to ensure an answer
                 if not output_text:
@@ -1114,17 +1372,9 @@ def orchestrate(req: func.HttpRequest) -> func.HttpResponse:
                     except Exception:
                         pass
             else:
-                response = client.responses.create(**responses_args)
-                output_text = getattr(response, "output_text", None) or ""
+                response, output_text = _quick_answer(client, responses_args)
         duration_ms = int((time.perf_counter() - started) * 1000)
 
-        # Memory: persist turn in a single conversation document (id == conversation_id)
-        try:
-            if user_id and conversation_id:
-                cosmos_upsert_conversation_turn(user_id, conversation_id, prompt, output_text)
-        except Exception:
-            pass
-
         payload = {
             **decision_payload,
             "output_text": output_text,
@@ -1132,22 +1382,33 @@ def orchestrate(req: func.HttpRequest) -> func.HttpResponse:
             "conversation_id": conversation_id,
             "new_conversation": orig_missing_conversation_id,
         }
-        # Include classic tool usage when available
-        try:
-            used_tools = getattr(response, "_classic_tools_used", None)
-            if isinstance(used_tools, list) and used_tools:
-                payload["tool_used"] = used_tools
-        except Exception:
-            pass
-        resp = func.HttpResponse(json.dumps(payload, ensure_ascii=False), mimetype="application/json")
-        try:
+        _attach_tools(payload, response)
+        resp = func.HttpResponse(_dumps(payload), mimetype="application/json")
+        if conversation_id:
             resp.headers["X-Conversation-Id"] = conversation_id
-        except Exception:
-            pass
+        # Memory: persist turn in a single conversation document (id == conversation_id)
+        if user_id and conversation_id:
+            _persist_orchestrate_turn(user_id, conversation_id, prompt, output_text, orig_missing_conversation_id)
         return resp
     except Exception as e:
         logging.exception("orchestrate failed")
-        return func.HttpResponse(json.dumps({"error": str(e)}, ensure_ascii=False), status_code=500, mimetype="application/json")
+        return func.HttpResponse(_dumps({"error": str(e)}), status_code=500, mimetype="application/json")
+
+
+def _persist_orchestrate_turn(user_id: str, conversation_id: str, prompt: str, output_text: str, new_conversation: bool) -> None:
+    """Store an orchestrate turn in its conversation document.
+
+    A new conversation is written before responding: its id comes from MAX(memory_id), so the
+    document must exist before another new conversation derives the next one. Follow-up turns
+    go through the background queue; history reads wait for them (wait_for_conversation_turns).
+    """
+    if new_conversation:
+        try:
+            cosmos_upsert_conversation_turn(user_id, conversation_id, prompt, output_text)
+        except Exception:
+            pass
+        return
+    cosmos_enqueue_conversation_turn(user_id, conversation_id, prompt, output_text)
 
 
 def _get_json(req: func.HttpRequest) -> dict:
@@ -1162,88 +1423,70 @@ def _qp(req: func.HttpRequest) -> dict:
 
 def _json_response(payload, status=200):
     return func.HttpResponse(
-        json.dumps(payload, ensure_ascii=False),
+        _dumps(payload),
         status_code=status,
         mimetype="application/json",
     )
 
 
 def _call_list_images_backend(args: dict) -> tuple[int, dict]:
-    base = os.getenv("DOCSVC_BASE_URL")
-    url = f"{base.rstrip('/')}/api/users/images"
-    timeout_s = float(os.getenv("DOCSVC_TIMEOUT_SECONDS"))
+    url = f"{_DOCSVC_BASE_URL}/api/users/images"
+    timeout_s = _DOCSVC_TIMEOUT_SECONDS
 
     payload = {"user_id": args.get("user_id")}
     if "pageSize" in args and args["pageSize"]:
         payload["pageSize"] = int(args["pageSize"])
 
-    r = requests.get(url, json=payload, timeout=timeout_s)
+    r = get_http_session().get(url, json=payload, timeout=timeout_s)
     try:
-        data = r.json()
+        data = _loads(r.content)
     except Exception:
         data = {"raw": r.text}
     return r.status_code, data
 
-def _build_list_images_tool_def():
-    return {
-        "type": "function",
-        "function": {
-            "name": "list_images",
-            "description": "List a user's images.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "user_id": {
-                        "type": "string",
-                        "description": "User identifier"
-                    },
-                    "pageSize": {
-                        "type": "integer",
-                        "description": "Max items per page (optional)"
-                    }
-                },
-                "required": ["user_id"],
-            },
-        },
-    }
-
-@app.function_name("list_images_test")
-@app.route(route="list-images-test", methods=["POST"])
-def list_images_test(req: func.HttpRequest) -> func.HttpResponse:
+def _docsvc_json_body(r) -> bytes:
+    """Doc-service response body as JSON bytes: forwarded as-is when valid, wrapped as ``{"raw": text}`` otherwise."""
     try:
-        body = req.get_json()
+        _loads(r.content)
     except Exception:
-        body = {}
+        return _dumps({"raw": r.text})
+    return r.content
 
-    prompt = (body.get("prompt") or "").strip()
+
+def _docsvc_result(r) -> tuple:
+    """``(json_body, ok)`` for a doc-service response, as returned by the tool-test fetchers."""
+    return _docsvc_json_body(r), r.ok
+
+
+def _tool_test_handler(prompt, params, tools, fetch, synthesize=None, cache_tool_results=True):
+    """Shared flow of the *_test endpoints.
+
+    The model picks the tool; ``fetch(args)`` runs the backend call and returns ``(body, ok)``:
+    its JSON body as bytes and whether the call succeeded. The final answer comes from a
+    follow-up completion, or from ``synthesize(args, body)`` when given.
+    ``cache_tool_results=False`` keeps mutating backend calls out of the response cache;
+    failed backend calls are never cached.
+    """
     if not prompt:
-        return func.HttpResponse(
-            json.dumps({"error": "Missing 'prompt'"}),
-            status_code=400,
-            mimetype="application/json",
-        )
+        return _json_response({"error": "Missing 'prompt'"}, status=400)
 
-    model = os.getenv("AZURE_OPENAI_MODEL", "gpt-4o")
+    model = _AOAI_MODEL
     client = _get_aoai_client()
+    messages = _tool_test_messages(prompt, **params)
 
-    messages = [{"role": "user", "content": prompt}]
-    if body.get("user_id"):
-        messages.append({"role": "system", "content": f"user_id={body['user_id']}"})
-    if body.get("pageSize"):
-        messages.append({"role": "system", "content": f"pageSize={body['pageSize']}"})
-
-    tools = [_build_list_images_tool_def()]
+    cache_key = _tool_test_cache_key(model, messages, tools)
+    cached = _tool_test_cache_get(cache_key)
+    if cached is not None:
+        return func.HttpResponse(cached, mimetype="application/json")
 
     try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            tools=tools,
-            tool_choice="auto",
-        )
-        msg = resp.choices[0].message
+        # 1) Appel modèle (l'appel backend part dès que les arguments de la tool sont complets)
+        msg, args, backend_future = _stream_tool_choice(client, model, messages, tools, fetch)
         result = {"answer": msg.content}
+        backend_raw = None
+        backend_ok = True
 
+        # 2) Si tool appelée → résultat backend puis synthèse
         if msg.tool_calls:
             tc = msg.tool_calls[0]
             result["tool_called"] = {
@@ -1251,535 +1494,386 @@ def list_images_test(req: func.HttpRequest) -> func.HttpResponse:
                 "arguments": tc.function.arguments,
             }
 
-            base = os.getenv("DOCSVC_BASE_URL").rstrip("/")
-            func_key = os.getenv("DOCSVC_FUNCTION_KEY")
-            backend_url = f"{base}/users/images?code={func_key}"
+            backend_raw, backend_ok = backend_future.result()
+            if synthesize is not None:
+                result["answer"] = synthesize(args, backend_raw)
+            else:
+                messages.append(msg)
+                messages.append({
+                    "role": "tool",
+                    "tool_call_id": tc.id,
+                    "content": _tool_body_content(backend_raw),
+                })
+                follow_up = client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    **_follow_up_token_cap(model),
+                )
+                result["answer"] = follow_up.choices[0].message.content
 
-            headers = {"Content-Type": "application/json"}
-            r = requests.get(backend_url, json=json.loads(tc.function.arguments), headers=headers, timeout=20)
-            try:
-                backend_data = r.json()
-            except Exception:
-                backend_data = {"raw": r.text}
+        response_body = _dumps(result) if backend_raw is None else _dumps_with_raw(result, "backend_result", backend_raw)
+        # Errors (e.g. a transient 503 from the backend) are not cached: the next call retries
+        if backend_ok and (cache_tool_results or not msg.tool_calls):
+            _tool_test_cache_put(cache_key, response_body)
+        return func.HttpResponse(response_body, mimetype="application/json")
 
-            follow_up = client.chat.completions.create(
-                model=model,
-                messages=messages + [
-                    msg,
-                    {
-                        "role": "tool",
-                        "tool_call_id": tc.id,
-                        "content": json.dumps(backend_data),
-                    },
-                ],
-            )
-            result["answer"] = follow_up.choices[0].message.content
-            result["backend_result"] = backend_data
+    except Exception as e:
+        return _json_response({"error": str(e)}, status=500)
+
+
+_LIST_IMAGES_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "list_images",
+        "description": "List a user's images.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "user_id": {
+                    "type": "string",
+                    "description": "User identifier"
+                },
+                "pageSize": {
+                    "type": "integer",
+                    "description": "Max items per page (optional)"
+                }
+            },
+            "required": ["user_id"],
+        },
+    },
+}
+_LIST_IMAGES_TOOLS = [_LIST_IMAGES_TOOL]
 
-        return func.HttpResponse(
-            json.dumps(result, ensure_ascii=False),
-            mimetype="application/json",
-        )
 
-    except Exception as e:
-        return func.HttpResponse(
-            json.dumps({"error": str(e)}),
-            status_code=500,
-            mimetype="application/json",
-        )
+def _fetch_user_images(args: dict) -> tuple:
+    backend_url = f"{_DOCSVC_BASE_URL}/users/images?code={_DOCSVC_FUNCTION_KEY}"
+    headers = {"Content-Type": "application/json"}
+    return _docsvc_result(get_http_session().get(backend_url, json=args, headers=headers, timeout=_DOCSVC_TIMEOUT_SECONDS))
 
 
-def _build_list_templates_tool_def():
-    return {
-        "type": "function",
-        "function": {
-            "name": "list_templates_http",
-            "description": "List a user's templates (optionally include shared).",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "user_id": {
-                        "type": "string",
-                        "description": "User identifier"
-                    },
-                    "pageSize": {
-                        "type": "integer",
-                        "description": "Max items per page (optional)"
-                    },
-                    "includeShared": {
-                        "type": "boolean",
-                        "description": "Whether to include shared templates"
-                    }
+@app.function_name("list_images_test")
+@app.route(route="list-images-test", methods=["POST"])
+def list_images_test(req: func.HttpRequest) -> func.HttpResponse:
+    body = _get_json(req)
+    return _tool_test_handler(
+        (body.get("prompt") or "").strip(),
+        {"user_id": body.get("user_id") or None, "pageSize": body.get("pageSize") or None},
+        _LIST_IMAGES_TOOLS,
+        _fetch_user_images,
+    )
+
+
+_LIST_TEMPLATES_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "list_templates_http",
+        "description": "List a user's templates (optionally include shared).",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "user_id": {
+                    "type": "string",
+                    "description": "User identifier"
+                },
+                "pageSize": {
+                    "type": "integer",
+                    "description": "Max items per page (optional)"
                 },
-                "required": ["user_id"],
+                "includeShared": {
+                    "type": "boolean",
+                    "description": "Whether to include shared templates"
+                }
             },
+            "required": ["user_id"],
         },
-    }
+    },
+}
+_LIST_TEMPLATES_TOOLS = [_LIST_TEMPLATES_TOOL]
+
+
+def _fetch_user_templates(args: dict) -> tuple:
+    backend_url = f"{_DOCSVC_BASE_URL}/users/templates?code={_DOCSVC_FUNCTION_KEY}"
+    headers = {"Content-Type": "application/json"}
+    return _docsvc_result(get_http_session().get(backend_url, json=args, headers=headers, timeout=_DOCSVC_TIMEOUT_SECONDS))
 
 
 @app.function_name("list_templates_test")
 @app.route(route="list-templates-test", methods=["POST"])
 def list_templates_test(req: func.HttpRequest) -> func.HttpResponse:
-    try:
-        body = req.get_json()
-    except Exception:
-        body = {}
-
-    prompt = (body.get("prompt") or "").strip()
-    if not prompt:
-        return func.HttpResponse(
-            json.dumps({"error": "Missing 'prompt'"}),
-            status_code=400,
-            mimetype="application/json",
-        )
-
-    model = os.getenv("AZURE_OPENAI_MODEL", "gpt-4o")
-    client = _get_aoai_client()
-
-    messages = [{"role": "user", "content": prompt}]
-    if body.get("user_id"):
-        messages.append({"role": "system", "content": f"user_id={body['user_id']}"})
-    if body.get("pageSize"):
-        messages.append({"role": "system", "content": f"pageSize={body['pageSize']}"})
-    if body.get("includeShared") is not None:
-        messages.append({"role": "system", "content": f"includeShared={body['includeShared']}"})
+    body = _get_json(req)
+    return _tool_test_handler(
+        (body.get("prompt") or "").strip(),
+        {
+            "user_id": body.get("user_id") or None,
+            "pageSize": body.get("pageSize") or None,
+            "includeShared": body.get("includeShared"),
+        },
+        _LIST_TEMPLATES_TOOLS,
+        _fetch_user_templates,
+    )
 
-    tools = [_build_list_templates_tool_def()]
 
-    try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            tools=tools,
-            tool_choice="auto",
-        )
-        msg = resp.choices[0].message
-        result = {"answer": msg.content}
+_LIST_SHARED_TEMPLATES_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "list_shared_templates",
+        "description": "List shared templates (all locales) from the org prefix.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "pageSize": {
+                    "type": "integer",
+                    "description": "Max items per page (optional)"
+                }
+            },
+            "additionalProperties": False
+        },
+    },
+}
+_LIST_SHARED_TEMPLATES_TOOLS = [_LIST_SHARED_TEMPLATES_TOOL]
 
-        if msg.tool_calls:
-            tc = msg.tool_calls[0]
-            result["tool_called"] = {
-                "name": tc.function.name,
-                "arguments": tc.function.arguments,
-            }
+# Shared templates change rarely: keep the merged listing per pageSize for a minute, then
+# revalidate it with If-None-Match against the ETag of the first page.
+_SHARED_TEMPLATES_CACHE: dict = {}
+_SHARED_TEMPLATES_CACHE_LOCK = threading.Lock()
+_SHARED_TEMPLATES_TTL_SECONDS = 60.0
 
-            base = os.getenv("DOCSVC_BASE_URL").rstrip("/")
-            func_key = os.getenv("DOCSVC_FUNCTION_KEY")
-            backend_url = f"{base}/users/templates?code={func_key}"
 
-            headers = {"Content-Type": "application/json"}
-            r = requests.get(backend_url, json=json.loads(tc.function.arguments), headers=headers, timeout=int(os.getenv("DOCSVC_TIMEOUT_SECONDS", "20")))
-            try:
-                backend_data = r.json()
-            except Exception:
-                backend_data = {"raw": r.text}
+def _list_shared_template_items(args: dict) -> tuple:
+    """``(items, ok)`` for the shared templates; a failed listing is returned but never cached."""
+    # Appel backend: GET avec query params + clé de fonction
+    backend_url = f"{_DOCSVC_BASE_URL}/templates"
 
-            follow_up = client.chat.completions.create(
-                model=model,
-                messages=messages + [
-                    msg,
-                    {
-                        "role": "tool",
-                        "tool_call_id": tc.id,
-                        "content": json.dumps(backend_data),
-                    },
-                ],
-            )
-            result["answer"] = follow_up.choices[0].message.content
-            result["backend_result"] = backend_data
+    page_size = None
+    if "pageSize" in args and args["pageSize"]:
+        try:
+            page_size = int(args["pageSize"])
+        except Exception:
+            pass
 
-        return func.HttpResponse(
-            json.dumps(result, ensure_ascii=False),
-            mimetype="application/json",
+    cache_key = (page_size,)
+    with _SHARED_TEMPLATES_CACHE_LOCK:
+        cached_entry = _SHARED_TEMPLATES_CACHE.get(cache_key)
+    if cached_entry is not None and cached_entry[0] > time.monotonic():
+        return cached_entry[2], True
+
+    all_items = []
+    next_token = None
+    etag = None
+
+    while True:
+        params = {}
+        if page_size is not None:
+            params["pageSize"] = page_size
+        headers = {}
+        if next_token:
+            params["continuationToken"] = next_token
+        elif cached_entry is not None and cached_entry[1]:
+            headers["If-None-Match"] = cached_entry[1]
+        params["code"] = _DOCSVC_FUNCTION_KEY  # auth_level=FUNCTION
+
+        r = get_http_session().get(
+            backend_url,
+            params=params,
+            headers=headers,
+            timeout=_DOCSVC_TIMEOUT_SECONDS,
         )
-
-    except Exception as e:
-        return func.HttpResponse(
-            json.dumps({"error": str(e)}),
-            status_code=500,
-            mimetype="application/json",
+        if r.status_code == 304 and cached_entry is not None:
+            # Listing unchanged since the cached copy: extend its lifetime
+            all_items, etag = cached_entry[2], cached_entry[1]
+            break
+        if not r.ok:
+            # Error bodies carry no items: report the failure, keep any cached listing as it is
+            return all_items, False
+        if not next_token:
+            etag = r.headers.get("ETag")
+        data = _loads(r.content)
+        all_items.extend(data.get("items", []))
+        next_token = data.get("continuationToken")
+        if not next_token:
+            break
+
+    with _SHARED_TEMPLATES_CACHE_LOCK:
+        _SHARED_TEMPLATES_CACHE[cache_key] = (
+            time.monotonic() + _SHARED_TEMPLATES_TTL_SECONDS, etag, all_items
         )
+    return all_items, True
 
 
-def _build_list_shared_templates_tool_def():
-    return {
-        "type": "function",
-        "function": {
-            "name": "list_shared_templates",
-            "description": "List shared templates (all locales) from the org prefix.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "pageSize": {
-                        "type": "integer",
-                        "description": "Max items per page (optional)"
-                    }
-                },
-                "additionalProperties": False
-            },
-        },
-    }
+def _fetch_shared_templates(args: dict) -> tuple:
+    items, ok = _list_shared_template_items(args)
+    return _dumps({"items": items}), ok
 
 
 @app.function_name("list_shared_templates_test")
 @app.route(route="list-shared-templates-test", methods=["GET"])
 def list_shared_templates_test(req: func.HttpRequest) -> func.HttpResponse:
     # Pas de body en GET, on prend query params
-    prompt = (req.params.get("prompt") or "").strip()
-    if not prompt:
-        return func.HttpResponse(
-            json.dumps({"error": "Missing 'prompt'"}),
-            status_code=400,
-            mimetype="application/json",
-        )
-
-    model = os.getenv("AZURE_OPENAI_MODEL")
-    client = _get_aoai_client()
-
-    messages = [{"role": "user", "content": prompt}]
-    if req.params.get("pageSize"):
-        messages.append({"role": "system", "content": f"pageSize={req.params['pageSize']}"})
-
-    tools = [_build_list_shared_templates_tool_def()]
-
-    try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            tools=tools,
-            tool_choice="auto",
-        )
-        msg = resp.choices[0].message
-        result = {"answer": msg.content}
-
-        if msg.tool_calls:
-            tc = msg.tool_calls[0]
-            result["tool_called"] = {
-                "name": tc.function.name,
-                "arguments": tc.function.arguments,
-            }
-
-            # Appel backend: GET avec query params + clé de fonction
-            base = os.getenv("DOCSVC_BASE_URL").rstrip("/")
-            func_key = os.getenv("DOCSVC_FUNCTION_KEY")
-            backend_url = f"{base}/templates"
-
-            args = {}
-            try:
-                args = json.loads(tc.function.arguments or "{}")
-            except Exception:
-                args = {}
-
-            params = {}
-            if "pageSize" in args and args["pageSize"]:
-                try:
-                    params["pageSize"] = int(args["pageSize"])
-                except Exception:
-                    pass
-            params["code"] = func_key  # auth_level=FUNCTION
+    params = _qp(req)
+    return _tool_test_handler(
+        (params.get("prompt") or "").strip(),
+        {"pageSize": params.get("pageSize") or None},
+        _LIST_SHARED_TEMPLATES_TOOLS,
+        _fetch_shared_templates,
+    )
 
-            all_items = []
-            next_token = None
 
-            while True:
-                params = {}
-                if "pageSize" in args and args["pageSize"]:
-                    try:
-                        params["pageSize"] = int(args["pageSize"])
-                    except Exception:
-                        pass
-                if next_token:
-                    params["continuationToken"] = next_token
-                params["code"] = func_key  # auth_level=FUNCTION
-
-                r = requests.get(
-                    backend_url,
-                    params=params,
-                    timeout=int(os.getenv("DOCSVC_TIMEOUT_SECONDS", "20")),
-                )
-                data = r.json()
-                all_items.extend(data.get("items", []))
-                next_token = data.get("continuationToken")
-                if not next_token:
-                    break
-
-            backend_data = {"items": all_items}
+_CONVERT_WORD_TO_PDF_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "convert_word_to_pdf",
+        "description": "Convert an existing .docx/.dotx in blob storage to PDF.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "blob": {
+                    "type": "string",
+                    "description": "Blob path of the source .docx/.dotx (e.g., 'user123/new.docx')"
+                },
+                "dest": {
+                    "type": "string",
+                    "description": "Optional destination blob path for the PDF"
+                }
+            },
+            "required": ["blob"]
+        }
+    }
+}
+_CONVERT_WORD_TO_PDF_TOOLS = [_CONVERT_WORD_TO_PDF_TOOL]
 
 
-            follow_up = client.chat.completions.create(
-                model=model,
-                messages=messages + [
-                    msg,
-                    {
-                        "role": "tool",
-                        "tool_call_id": tc.id,
-                        "content": json.dumps(backend_data),
-                    },
-                ],
-            )
-            result["answer"] = follow_up.choices[0].message.content
-            result["backend_result"] = backend_data
+def _post_convert_word_to_pdf(args: dict):
+    backend_url = f"{_DOCSVC_BASE_URL}/convert/word-to-pdf"
 
-        return func.HttpResponse(
-            json.dumps(result, ensure_ascii=False),
-            mimetype="application/json",
-        )
+    params = {"code": _DOCSVC_FUNCTION_KEY}
+    if "blob" in args and args["blob"]:
+        params["blob"] = args["blob"]
+    if "dest" in args and args["dest"]:
+        params["dest"] = args["dest"]
 
-    except Exception as e:
-        return func.HttpResponse(
-            json.dumps({"error": str(e)}),
-            status_code=500,
-            mimetype="application/json",
-        )
+    return get_http_session().post(
+        backend_url,
+        params=params,   # le backend lit blob/dest en query
+        timeout=_DOCSVC_TIMEOUT_SECONDS,
+    )
 
 
-def _build_convert_word_to_pdf_tool_def():
-    return {
-        "type": "function",
-        "function": {
-            "name": "convert_word_to_pdf",
-            "description": "Convert an existing .docx/.dotx in blob storage to PDF.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "blob": {
-                        "type": "string",
-                        "description": "Blob path of the source .docx/.dotx (e.g., 'user123/new.docx')"
-                    },
-                    "dest": {
-                        "type": "string",
-                        "description": "Optional destination blob path for the PDF"
-                    }
-                },
-                "required": ["blob"]
-            }
-        }
-    }
+def _fetch_convert_word_to_pdf(args: dict) -> tuple:
+    return _docsvc_result(_post_convert_word_to_pdf(args))
 
 
 @app.function_name("convert_word_to_pdf_test")
 @app.route(route="convert-word-to-pdf-test", methods=["POST"])
 def convert_word_to_pdf_test(req: func.HttpRequest) -> func.HttpResponse:
-    try:
-        body = req.get_json()
-    except Exception:
-        body = {}
-
+    body = _get_json(req)
     prompt = (body.get("prompt") or "").strip()
     if not prompt:
-        return func.HttpResponse(
-            json.dumps({"error": "Missing 'prompt'"}),
-            status_code=400,
-            mimetype="application/json",
-        )
+        return _json_response({"error": "Missing 'prompt'"}, status=400)
 
-    model = os.getenv("AZURE_OPENAI_MODEL")
-    client = _get_aoai_client()
-
-    # On laisse le modèle déclencher la tool ; on lui file juste les args si fournis
-    messages = [{"role": "user", "content": prompt}]
+    # blob fourni : rien à extraire du prompt, on appelle le backend directement sans LLM
     if body.get("blob"):
-        messages.append({"role": "system", "content": f"blob={body['blob']}"})
-    if body.get("dest"):
-        messages.append({"role": "system", "content": f"dest={body['dest']}"})
-
-    tools = [_build_convert_word_to_pdf_tool_def()]
-
-    try:
-        # 1) Appel modèle
-        resp = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            tools=tools,
-            tool_choice="auto",
-        )
-        msg = resp.choices[0].message
-        result = {"answer": msg.content}
-
-        # 2) Si tool appelée → appel backend réel (POST + query params)
-        if msg.tool_calls:
-            tc = msg.tool_calls[0]
-            result["tool_called"] = {
-                "name": tc.function.name,
-                "arguments": tc.function.arguments,
+        args = {"blob": body["blob"]}
+        if body.get("dest"):
+            args["dest"] = body["dest"]
+        try:
+            r = _post_convert_word_to_pdf(args)
+            if r.ok:
+                answer = f"Converted {args['blob']} to PDF."
+            else:
+                answer = f"Conversion of {args['blob']} to PDF failed (HTTP {r.status_code})."
+            result = {
+                "answer": answer,
+                "tool_called": {
+                    "name": _CONVERT_WORD_TO_PDF_TOOL["function"]["name"],
+                    "arguments": _dumps(args).decode("utf-8"),
+                },
             }
-
-            base = os.getenv("DOCSVC_BASE_URL").rstrip("/")
-            func_key = os.getenv("DOCSVC_FUNCTION_KEY")
-            backend_url = f"{base}/convert/word-to-pdf"
-
-            try:
-                args = json.loads(tc.function.arguments or "{}")
-            except Exception:
-                args = {}
-
-            params = {"code": func_key}
-            if "blob" in args and args["blob"]:
-                params["blob"] = args["blob"]
-            if "dest" in args and args["dest"]:
-                params["dest"] = args["dest"]
-
-            r = requests.post(
-                backend_url,
-                params=params,   # le backend lit blob/dest en query
-                timeout=int(os.getenv("DOCSVC_TIMEOUT_SECONDS", "20")),
-            )
-            try:
-                backend_data = r.json()
-            except Exception:
-                backend_data = {"raw": r.text}
-
-            # 3) Boucle de synthèse
-            follow_up = client.chat.completions.create(
-                model=model,
-                messages=messages + [
-                    msg,
-                    {
-                        "role": "tool",
-                        "tool_call_id": tc.id,
-                        "content": json.dumps(backend_data),
-                    },
-                ],
+            return func.HttpResponse(
+                _dumps_with_raw(result, "backend_result", _docsvc_json_body(r)),
+                mimetype="application/json",
             )
-            result["answer"] = follow_up.choices[0].message.content
-            result["backend_result"] = backend_data
-
-        return func.HttpResponse(
-            json.dumps(result, ensure_ascii=False),
-            mimetype="application/json",
-        )
-
-    except Exception as e:
-        return func.HttpResponse(
-            json.dumps({"error": str(e)}),
-            status_code=500,
-            mimetype="application/json",
-        )
+        except Exception as e:
+            return _json_response({"error": str(e)}, status=500)
+
+    # On laisse le modèle extraire le blob du prompt ; on lui file juste dest si fourni
+    return _tool_test_handler(
+        prompt,
+        {"dest": body.get("dest") or None},
+        _CONVERT_WORD_TO_PDF_TOOLS,
+        _fetch_convert_word_to_pdf,
+        # Backend calls of this tool mutate storage: only plain model answers are cached
+        cache_tool_results=False,
+    )
 
 
-def _build_init_user_tool_def():
-    return {
-        "type": "function",
-        "function": {
-            "name": "init_user",
-            "description": "Initialize user folders in blob storage (creates .keep in required subdirs).",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "user_id": {
-                        "type": "string",
-                        "description": "User identifier"
-                    }
-                },
-                "required": ["user_id"]
-            }
+_INIT_USER_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "init_user",
+        "description": "Initialize user folders in blob storage (creates .keep in required subdirs).",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "user_id": {
+                    "type": "string",
+                    "description": "User identifier"
+                }
+            },
+            "required": ["user_id"]
         }
     }
+}
+_INIT_USER_TOOLS = [_INIT_USER_TOOL]
 
 
-@app.function_name("init_user_test")
-@app.route(route="init-user-test", methods=["POST"])
-def init_user_test(req: func.HttpRequest) -> func.HttpResponse:
-    try:
-        body = req.get_json()
-    except Exception:
-        body = {}
-
-    prompt = (body.get("prompt") or "").strip()
-    if not prompt:
-        return func.HttpResponse(
-            json.dumps({"error": "Missing 'prompt'"}),
-            status_code=400,
-            mimetype="application/json",
-        )
-
-    model = os.getenv("AZURE_OPENAI_MODEL", "gpt-4o")
-    client = _get_aoai_client()
-
-    messages = [{"role": "user", "content": prompt}]
-    if body.get("user_id"):
-        messages.append({"role": "system", "content": f"user_id={body['user_id']}"})
-
-    tools = [_build_init_user_tool_def()]
+def _fetch_init_user(args: dict) -> tuple:
+    backend_url = f"{_DOCSVC_BASE_URL}/users/init?code={_DOCSVC_FUNCTION_KEY}"
+    headers = {"Content-Type": "application/json"}
+    return _docsvc_result(get_http_session().post(
+        backend_url,
+        json=args,
+        headers=headers,
+        timeout=_DOCSVC_TIMEOUT_SECONDS,
+    ))
 
-    try:
-        # 1) Appel modèle
-        resp = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            tools=tools,
-            tool_choice="auto",
-        )
-        msg = resp.choices[0].message
-        result = {"answer": msg.content}
 
-        # 2) Si tool appelée → POST backend avec JSON + ?code=
-        if msg.tool_calls:
-            tc = msg.tool_calls[0]
-            result["tool_called"] = {
-                "name": tc.function.name,
-                "arguments": tc.function.arguments,
-            }
+def _init_user_answer(args: dict, backend_raw: bytes) -> str:
+    # 3) Synthèse finale
+    created = _loads(backend_raw).get("created") or []
+    uid = args.get("user_id")
 
-            base = os.getenv("DOCSVC_BASE_URL").rstrip("/")
-            func_key = os.getenv("DOCSVC_FUNCTION_KEY")
-            backend_url = f"{base}/users/init?code={func_key}"
+    if not created:
+        return f"L'espace pour '{uid}' est déjà initialisé."
 
-            try:
-                args = json.loads(tc.function.arguments or "{}")
-            except Exception:
-                args = {}
+    # Extraire les noms de dossiers (sans .keep)
+    folders = []
+    for ph in created:
+        parts = str(ph).split("/")
+        # parts = [user_id, maybe folder, ".keep"]
+        if len(parts) >= 2 and parts[1] and parts[1] != ".keep":
+            folders.append(parts[1])
+    folders = sorted(set(folders))
 
-            headers = {"Content-Type": "application/json"}
-            r = requests.post(
-                backend_url,
-                json=args,
-                headers=headers,
-                timeout=int(os.getenv("DOCSVC_TIMEOUT_SECONDS", "20")),
-            )
-            try:
-                backend_data = r.json()
-            except Exception:
-                backend_data = {"raw": r.text}
+    if folders:
+        return f"Votre espace '{uid}' a été créé sur le blob. Dossiers : {', '.join(folders)}."
+    # Si tu ne veux rien lister du tout :
+    return f"Votre espace '{uid}' a été créé sur le blob."
 
-            # 3) Synthèse finale
-            created = backend_data.get("created") or []
-            try:
-                uid = (json.loads(tc.function.arguments or "{}")).get("user_id")
-            except Exception:
-                uid = None
 
-            if not created:
-                result["answer"] = f"L'espace pour '{uid}' est déjà initialisé."
-            else:
-                # Extraire les noms de dossiers (sans .keep)
-                folders = []
-                for ph in created:
-                    parts = str(ph).split("/")
-                    # parts = [user_id, maybe folder, ".keep"]
-                    if len(parts) >= 2 and parts[1] and parts[1] != ".keep":
-                        folders.append(parts[1])
-                folders = sorted(set(folders))
-
-                if folders:
-                    result["answer"] = f"Votre espace '{uid}' a été créé sur le blob. Dossiers : {', '.join(folders)}."
-                else:
-                    # Si tu ne veux rien lister du tout :
-                    result["answer"] = f"Votre espace '{uid}' a été créé sur le blob."
-
-            result["backend_result"] = backend_data
-
-        return func.HttpResponse(
-            json.dumps(result, ensure_ascii=False),
-            mimetype="application/json",
-        )
+@app.function_name("init_user_test")
+@app.route(route="init-user-test", methods=["POST"])
+def init_user_test(req: func.HttpRequest) -> func.HttpResponse:
+    body = _get_json(req)
+    return _tool_test_handler(
+        (body.get("prompt") or "").strip(),
+        {"user_id": body.get("user_id") or None},
+        _INIT_USER_TOOLS,
+        _fetch_init_user,
+        synthesize=_init_user_answer,
+        # Backend calls of this tool mutate storage: only plain model answers are cached
+        cache_tool_results=False,
+    )
 
-    except Exception as e:
-        return func.HttpResponse(
-            json.dumps({"error": str(e)}),
-            status_code=500,
-            mimetype="application/json",
-        )
 
 @app.function_name("mcp_run")
 @app.route(route="mcp-run", methods=["POST"])
@@ -1858,12 +1952,7 @@ def mcp_run(req: func.HttpRequest) -> func.HttpResponse:
     if user_id:
         payload["user_id"] = user_id
         payload["conversation_id"] = conversation_id
-    try:
-        used = getattr(response, "_classic_tools_used", None)
-        if used:
-            payload["tool_used"] = used
-    except Exception:
-        pass
+    _attach_tools(payload, response)
     return func.HttpResponse(json.dumps(payload, ensure_ascii=False), mimetype="application/json")
 
 
@@ -1957,17 +2046,18 @@ def mcp_process(req: func.HttpRequest) -> func.HttpResponse:
     if user_id:
         payload["user_id"] = user_id
         payload["conversation_id"] = conversation_id
-    try:
-        used = getattr(response, "_classic_tools_used", None)
-        if used:
-            payload["tool_used"] = used
-    except Exception:
-        pass
+    _attach_tools(payload, response)
     return func.HttpResponse(json.dumps(payload, ensure_ascii=False), mimetype="application/json")
 
 
+# TOOLS_SSE_URL / TOOLS_FUNCTIONS_KEY are resolved once per tool name
+@functools.lru_cache(maxsize=8)
+def _cached_mcp_tools(tool_name: str) -> list:
+    return [build_mcp_tool_config(tool_name)]
+
+
 def _build_mcp_hello_tools():
-    return [build_mcp_tool_config("hello_mcp")]
+    return _cached_mcp_tools("hello_mcp")
 
 
 @app.function_name("hello_mcp_test")
@@ -1979,29 +2069,36 @@ def hello_mcp_test(req: func.HttpRequest) -> func.HttpResponse:
         body = {}
     prompt = (body.get("prompt") or "Call hello_mcp").strip()
     if not prompt:
-        return func.HttpResponse(json.dumps({"error":"Missing 'prompt'"}), status_code=400, mimetype="application/json")
+        return func.HttpResponse(_dumps({"error":"Missing 'prompt'"}), status_code=400, mimetype="application/json")
 
     client = _get_aoai_client()
-    model = os.getenv("AZURE_OPENAI_MODEL")
+    model = _AOAI_MODEL
 
     try:
         tools = _build_mcp_hello_tools()
+        input_msgs = [{"role":"user","content":[{"type":"input_text","text": prompt}]}]
+        cache_key = _tool_test_cache_key(model, input_msgs, tools)
+        cached = _tool_test_cache_get(cache_key)
+        if cached is not None:
+            return func.HttpResponse(cached, mimetype="application/json")
         resp = client.responses.create(
             model=model,
-            input=[{"role":"user","content":[{"type":"input_text","text": prompt}]}],
+            input=input_msgs,
             tools=tools,
             tool_choice="auto",
             text={"format":{"type":"text"}}
         )
-        answer = getattr(resp, "output_text", "") or ""
-        return func.HttpResponse(json.dumps({"answer": answer}, ensure_ascii=False),
-                                 mimetype="application/json")
+        response_body = _answer_body(resp)
+        # A failed MCP call or incomplete response may succeed on retry: don't pin it for the TTL
+        if _responses_call_succeeded(resp):
+            _tool_test_cache_put(cache_key, response_body)
+        return func.HttpResponse(response_body, mimetype="application/json")
     except Exception as e:
-        return func.HttpResponse(json.dumps({"error": str(e)}), status_code=500, mimetype="application/json")
+        return func.HttpResponse(_dumps({"error": str(e)}), status_code=500, mimetype="application/json")
 
 
 def _build_mcp_word_create_tools():
-    return [build_mcp_tool_config("word_create_document")]
+    return _cached_mcp_tools("word_create_document")
 
 @app.function_name("word_create_document_test")
 @app.route(route="word-create-document-test", methods=["POST"])
@@ -2024,7 +2121,7 @@ def word_create_document_test(req: func.HttpRequest) -> func.HttpResponse:
     args = {k: v for k, v in args.items() if v is not None}
 
     client = _get_aoai_client()
-    model = os.getenv("AZURE_OPENAI_MODEL")
+    model = _AOAI_MODEL
 
     try:
         tools = _build_mcp_word_create_tools()
@@ -2034,7 +2131,7 @@ def word_create_document_test(req: func.HttpRequest) -> func.HttpResponse:
         if args:
             msgs.append({
                 "role": "system",
-                "content": [{"type": "input_text", "text": f"Call the MCP tool 'word_create_document' with these exact JSON arguments:\n{json.dumps(args)}"}],
+                "content": [{"type": "input_text", "text": f"Call the MCP tool 'word_create_document' with these exact JSON arguments:\n{_dumps(args).decode('utf-8')}"}],
             })
         msgs.append({
             "role": "user",
@@ -2049,11 +2146,10 @@ def word_create_document_test(req: func.HttpRequest) -> func.HttpResponse:
             text={"format": {"type": "text"}}
         )
 
-        answer = getattr(resp, "output_text", "") or ""
-        return func.HttpResponse(json.dumps({"answer": answer}, ensure_ascii=False), mimetype="application/json")
+        return func.HttpResponse(_answer_body(resp), mimetype="application/json")
 
     except Exception as e:
-        return func.HttpResponse(json.dumps({"error": str(e)}), status_code=500, mimetype="application/json")
+        return func.HttpResponse(_dumps({"error": str(e)}), status_code=500, mimetype="application/json")
 
 if os.getenv("ENABLE_MCP_TOOL_TEST", "").lower() in ("1", "true", "yes"):
     @app.function_name("mcp_tool_test")
@@ -2067,7 +2163,7 @@ if os.getenv("ENABLE_MCP_TOOL_TEST", "").lower() in ("1", "true", "yes"):
         tool_name = (body.get("tool") or "").strip()
         if not tool_name:
             return func.HttpResponse(
-                json.dumps({"error": "Missing 'tool'"}),
+                _dumps({"error": "Missing 'tool'"}),
                 status_code=400,
                 mimetype="application/json",
             )
@@ -2076,10 +2172,10 @@ if os.getenv("ENABLE_MCP_TOOL_TEST", "").lower() in ("1", "true", "yes"):
         args = body.get("args") if isinstance(body.get("args"), dict) else {}
 
         client = _get_aoai_client()
-        model = os.getenv("AZURE_OPENAI_MODEL")
+        model = _AOAI_MODEL
 
         try:
-            tool_cfg = build_mcp_tool_config(tool_name)
+            tool_cfg = _cached_mcp_tools(tool_name)[0]
             msgs = []
             if args:
                 msgs.append({
@@ -2087,7 +2183,7 @@ if os.getenv("ENABLE_MCP_TOOL_TEST", "").lower() in ("1", "true", "yes"):
                     "content": [
                         {
                             "type": "input_text",
-                            "text": f"Call the MCP tool '{tool_name}' with these exact JSON arguments:\n{json.dumps(args)}",
+                            "text": f"Call the MCP tool '{tool_name}' with these exact JSON arguments:\n{_dumps(args).decode('utf-8')}",
                         }
                     ],
                 })
@@ -2104,15 +2200,14 @@ if os.getenv("ENABLE_MCP_TOOL_TEST", "").lower() in ("1", "true", "yes"):
                 text={"format": {"type": "text"}},
             )
 
-            answer = getattr(resp, "output_text", "") or ""
             return func.HttpResponse(
-                json.dumps({"answer": answer}, ensure_ascii=False),
+                _answer_body(resp),
                 mimetype="application/json",
             )
 
         except Exception as e:
             return func.HttpResponse(
-                json.dumps({"error": str(e)}),
+                _dumps({"error": str(e)}),
                 status_code=500,
                 mimetype="application/json",
             )
@@ -1,15 +1,18 @@
 #!/usr/bin/env python3
 """
 Script pour reset les queues Azurite (Azure Storage Emulator)
-Usage: python reset_queues.py [--all]
+Usage: python reset_queues.py [--all] [--verbose-counts]
 """
 
 import argparse
+import functools
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 
 try:
-    from azure.storage.queue import QueueClient
+    from azure.storage.queue import QueueServiceClient
     from azure.core.exceptions import ResourceNotFoundError
 except ImportError:
     print("❌ Module azure-storage-queue manquant. Installez avec:")
@@ -26,53 +29,65 @@ AZURITE_CONNECTION_STRING = (
 )
 
 # Queues du projet
-PROJECT_QUEUES = [
+PROJECT_QUEUES = (
     "mcpjobs-copilot",
     "mcpjobs-copilot-poison",
     "mcpjobs",
     "mcpjobs-poison",
-]
+)
+
+
+_PRINT_LOCK = threading.Lock()
+
+
+def _log(message: str) -> None:
+    """print() protégé : les queues sont traitées en parallèle, évite les lignes entremêlées."""
+    with _PRINT_LOCK:
+        print(message)
 
 
-def clear_queue(queue_name: str) -> bool:
+@functools.lru_cache(maxsize=1)
+def _svc() -> QueueServiceClient:
+    """Client de service partagé : la chaîne de connexion est parsée une fois et le transport HTTP réutilisé."""
+    return QueueServiceClient.from_connection_string(AZURITE_CONNECTION_STRING)
+
+
+def clear_queue(svc: QueueServiceClient, queue_name: str, verbose_counts: bool = False) -> bool:
     """Vide une queue spécifique."""
     try:
-        queue_client = QueueClient.from_connection_string(
-            AZURITE_CONNECTION_STRING, queue_name
-        )
-        
-        # Vérifier si la queue existe
-        properties = queue_client.get_queue_properties()
-        message_count = properties.approximate_message_count
-        
+        queue_client = svc.get_queue_client(queue_name)
+
+        if not verbose_counts:
+            # Pas de comptage : un seul appel réseau par queue
+            queue_client.clear_messages()
+            _log(f"✅ Queue '{queue_name}' vidée")
+            return True
+
+        # Comptage demandé : lire les propriétés AVANT de vider, sinon le compte peut être pris après
+        message_count = queue_client.get_queue_properties().approximate_message_count
+
         if message_count == 0:
-            print(f"✅ Queue '{queue_name}' déjà vide")
+            _log(f"✅ Queue '{queue_name}' déjà vide")
             return True
-            
-        # Vider la queue
+
         queue_client.clear_messages()
-        print(f"✅ Queue '{queue_name}' vidée ({message_count} messages supprimés)")
+        _log(f"✅ Queue '{queue_name}' vidée ({message_count} messages supprimés)")
         return True
         
     except ResourceNotFoundError:
-        print(f"ℹ️  Queue '{queue_name}' n'existe pas")
+        _log(f"ℹ️  Queue '{queue_name}' n'existe pas")
         return True
         
     except Exception as e:
-        print(f"❌ Erreur avec queue '{queue_name}': {e}")
+        _log(f"❌ Erreur avec queue '{queue_name}': {e}")
         return False
 
 
 def list_all_queues() -> List[str]:
     """Liste toutes les queues existantes."""
     try:
-        from azure.storage.queue import QueueServiceClient
-        queue_service = QueueServiceClient.from_connection_string(AZURITE_CONNECTION_STRING)
-        
-        queues = []
-        for queue in queue_service.list_queues():
-            queues.append(queue.name)
-        return queues
+        # Pages de 200 : une seule requête de listing pour un émulateur local
+        return [queue.name for queue in _svc().list_queues(results_per_page=200)]
         
     except Exception as e:
         print(f"❌ Impossible de lister les queues: {e}")
@@ -86,6 +101,11 @@ def main():
         action="store_true", 
         help="Vider TOUTES les queues existantes (pas seulement celles du projet)"
     )
+    parser.add_argument(
+        "--verbose-counts",
+        action="store_true",
+        help="Afficher le nombre de messages supprimés par queue (un appel réseau de plus, lu avant le vidage)"
+    )
     parser.add_argument(
         "--list", 
         action="store_true", 
@@ -108,9 +128,6 @@ def main():
             print("   Aucune queue trouvée")
         return
     
-    success_count = 0
-    total_count = 0
-    
     if args.all:
         # Vider toutes les queues existantes
         print("⚠️  Mode --all: vidage de TOUTES les queues existantes")
@@ -123,10 +140,15 @@ def main():
         print("🎯 Mode normal: vidage des queues du projet uniquement")
         queues_to_clear = PROJECT_QUEUES
     
-    for queue_name in queues_to_clear:
-        total_count += 1
-        if clear_queue(queue_name):
-            success_count += 1
+    # Un nom ne doit être vidé qu'une fois (ordre conservé)
+    queues_to_clear = list(dict.fromkeys(queues_to_clear))
+    
+    # Les queues sont indépendantes : on les vide en parallèle sur le même client
+    svc = _svc()
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        results = list(ex.map(lambda name: clear_queue(svc, name, args.verbose_counts), queues_to_clear))
+    total_count = len(results)
+    success_count = sum(results)
     
     print()
     if success_count == total_count:
@@ -10,9 +10,12 @@ The script exits with a non-zero status if any tool name is missing.
 """
 from __future__ import annotations
 
+import mmap
+import os
+import re
 from pathlib import Path
 import sys
-from typing import Iterable
+from typing import Dict, Iterable, List, Optional, Set
 
 ROOT = Path(__file__).resolve().parents[1]
 TOOLS_FILE = ROOT / "mcp-tools-list.txt"
@@ -20,22 +23,92 @@ TEST_PATHS = [ROOT / "tests", ROOT / "tests_http"]
 CONFIG_PATHS = [ROOT / "function_app.py", ROOT / "app" / "services" / "tools.py"]
 
 
-def _read_text(paths: Iterable[Path]) -> str:
-    content = []
+SKIP_DIRS = {"__pycache__", ".git", "node_modules"}
+TEXT_SUFFIXES = (".py", ".http", ".md", ".txt", ".json")
+
+
+def _walk(root: str) -> Iterable[str]:
+    """Yield text files under ``root``; DirEntry caches the type from readdir, no stat per entry."""
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS:
+                        stack.append(entry.path)
+                elif entry.name.endswith(TEXT_SUFFIXES):
+                    yield entry.path
+
+
+def _iter_files(paths: Iterable[Path]) -> Iterable[str]:
     for path in paths:
         if path.is_file():
-            try:
-                content.append(path.read_text(encoding="utf-8", errors="ignore"))
-            except Exception:
-                pass
+            yield str(path)
         elif path.is_dir():
-            for sub in path.rglob("*"):
-                if sub.is_file():
-                    try:
-                        content.append(sub.read_text(encoding="utf-8", errors="ignore"))
-                    except Exception:
-                        pass
-    return "\n".join(content)
+            yield from _walk(str(path))
+
+
+def _map_file(path: str) -> Optional[mmap.mmap]:
+    """Memory-map ``path`` read-only so tool names can be searched as raw bytes."""
+    try:
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        # Unreadable or empty file (zero-length files cannot be mapped)
+        return None
+
+
+def _trie_pattern(node: Dict[bytes, dict]) -> bytes:
+    """Render a byte trie as a regex; optional groups are greedy, so the longest name wins."""
+    terminal = b"" in node
+    branches = [re.escape(key) + _trie_pattern(child) for key, child in sorted(node.items()) if key]
+    if not branches:
+        return b""
+    if len(branches) == 1 and not terminal:
+        return branches[0]
+    group = b"(?:" + b"|".join(branches) + b")"
+    return group + b"?" if terminal else group
+
+
+def _tools_regex(needles: Iterable[bytes]) -> "re.Pattern[bytes]":
+    """Compile the tool names into one prefix-factored pattern.
+
+    Names share long prefixes (``word_merge_table_cells_...``), so the trie lets the engine
+    walk each shared prefix once per offset instead of retrying every alternative.
+    """
+    trie: Dict[bytes, dict] = {}
+    for needle in needles:
+        node = trie
+        for i in range(len(needle)):
+            node = node.setdefault(needle[i:i + 1], {})
+        node[b""] = {}
+    return re.compile(b"(?=(" + _trie_pattern(trie) + b"))")
+
+
+def _missing_tools(tools: List[str], paths: Iterable[Path]) -> List[str]:
+    """Return the names in ``tools`` not referenced under ``paths``, in list order.
+
+    Files are scanned one at a time with a single regex pass each, and reading stops as soon
+    as every name has been seen. The pattern sits in a lookahead so every offset is probed and
+    the longest name there is captured; a name hidden behind a longer one starting at the same
+    offset is a substring of it, so it is credited from the longer match.
+    """
+    pattern = _tools_regex(t.encode("utf-8") for t in tools)
+    remaining = {t: t.encode("utf-8") for t in tools}
+    for path in _iter_files(paths):
+        mm = _map_file(path)
+        if mm is None:
+            continue
+        try:
+            seen: Set[bytes] = {m.group(1) for m in pattern.finditer(mm)}
+        finally:
+            mm.close()
+        remaining = {
+            t: needle for t, needle in remaining.items() if not any(needle in found for found in seen)
+        }
+        if not remaining:
+            break
+    return [t for t in tools if t in remaining]
 
 
 def main() -> int:
@@ -48,10 +121,7 @@ def main() -> int:
         if name:
             tools.append(name)
 
-    tests_text = _read_text(TEST_PATHS)
-    config_text = _read_text(CONFIG_PATHS)
-
-    missing = [t for t in tools if t not in tests_text and t not in config_text]
+    missing = _missing_tools(tools, TEST_PATHS + CONFIG_PATHS)
     if missing:
         print("Missing MCP tool references:")
         for name in missing:
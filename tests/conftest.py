@@ -0,0 +1,7 @@
+import pathlib
+import sys
+
+# Make the project root importable once for the whole test session
+ROOT = str(pathlib.Path(__file__).resolve().parents[1])
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -4,13 +4,23 @@ Test rapide de SearXNG local
 Script simple pour vérifier rapidement l'état de l'instance
 """
 
+import argparse
 import requests
 import json
 import sys
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is used when missing
+    orjson = None
 
-def quick_test():
-    """Test rapide de SearXNG"""
+
+def quick_test(verbose: bool = False):
+    """Test rapide de SearXNG
+
+    Par défaut seul le statut HTTP est vérifié : le corps n'est ni téléchargé ni parsé.
+    Avec ``verbose``, la réponse JSON est lue pour compter les résultats.
+    """
     url = "http://127.0.0.1:8080/search"
     params = {
         'q': 'test',
@@ -19,16 +29,21 @@ def quick_test():
     
     try:
         print("🔍 Test rapide SearXNG...")
-        response = requests.get(url, params=params, timeout=5)
-        
-        if response.status_code == 200:
-            data = response.json()
+        # stream=True : on rend la main dès les en-têtes reçus (HEAD n'est pas garanti sur /search)
+        with requests.get(url, params=params, timeout=5, stream=not verbose) as response:
+            if response.status_code != 200:
+                print(f"❌ Erreur HTTP: {response.status_code}")
+                return False
+
+            if not verbose:
+                print("✅ SearXNG OK")
+                return True
+
+            # Parse les octets bruts : pas de décodage en str ni de détection d'encodage
+            data = orjson.loads(response.content) if orjson is not None else json.loads(response.content)
             results_count = len(data.get('results', []))
             print(f"✅ SearXNG OK - {results_count} résultats")
             return True
-        else:
-            print(f"❌ Erreur HTTP: {response.status_code}")
-            return False
             
     except requests.exceptions.ConnectionError:
         print("❌ Impossible de se connecter à SearXNG")
@@ -43,5 +58,12 @@ def quick_test():
 
 
 if __name__ == "__main__":
-    success = quick_test()
+    parser = argparse.ArgumentParser(description="Test rapide de SearXNG local")
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Télécharger et parser la réponse pour afficher le nombre de résultats"
+    )
+    args = parser.parse_args()
+    success = quick_test(verbose=args.verbose)
     sys.exit(0 if success else 1)
@@ -1,31 +1,48 @@
 import json
 import logging
 from types import SimpleNamespace
-import sys
-import pathlib
 
 import pytest
 
-sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
 from app.services import conversation
 
 
-class FakeResponses:
+def _requires_action(resp_id, call):
+    required = SimpleNamespace(submit_tool_outputs=SimpleNamespace(tool_calls=[call]))
+    return SimpleNamespace(id=resp_id, status="requires_action", required_action=required)
+
+
+class FakeResponsesBase:
+    """Keeps every response it hands out so ``wait`` can return it by id."""
+
+    def __init__(self):
+        self._store = {}
+
+    def _remember(self, resp):
+        self._store[resp.id] = resp
+        return resp
+
+    def wait(self, id, **kwargs):
+        return self._store[id]
+
+
+class FakeClient:
+    def __init__(self, responses):
+        self.responses = responses
+
+
+class FakeResponses(FakeResponsesBase):
     def __init__(self, model):
+        super().__init__()
         self.model = model
         self.submit_models = []
-        self._store = {}
 
     def create(self, **kwargs):
         call = SimpleNamespace(
             id="call-search",
             function=SimpleNamespace(name="search_web", arguments=json.dumps({"query": "hello"})),
         )
-        submit = SimpleNamespace(tool_calls=[call])
-        required = SimpleNamespace(submit_tool_outputs=submit)
-        resp = SimpleNamespace(id="resp1", status="requires_action", required_action=required)
-        self._store[resp.id] = resp
-        return resp
+        return self._remember(_requires_action("resp1", call))
 
     def submit_tool_outputs(self, response_id, tool_outputs, model=None):
         # record model parameter used for submit
@@ -37,27 +54,16 @@ class FakeResponses:
                     name="convert_word_to_pdf", arguments=json.dumps({"blob": "file.docx"})
                 ),
             )
-            submit = SimpleNamespace(tool_calls=[call])
-            required = SimpleNamespace(submit_tool_outputs=submit)
-            resp = SimpleNamespace(id="resp2", status="requires_action", required_action=required)
+            resp = _requires_action("resp2", call)
         else:
             # final response
             resp = SimpleNamespace(id="resp3", status="completed", output_text="final output")
-        self._store[resp.id] = resp
-        return resp
-
-    def wait(self, id, **kwargs):
-        return self._store[id]
-
-
-class FakeClient:
-    def __init__(self, model):
-        self.responses = FakeResponses(model)
+        return self._remember(resp)
 
 
 @pytest.mark.parametrize("model_name", ["model-router", "gpt-oss-120b"])
 def test_multiple_tool_iterations_with_special_models(model_name, caplog, monkeypatch):
-    fake_client = FakeClient(model_name)
+    fake_client = FakeClient(FakeResponses(model_name))
     executed = []
 
     def fake_execute(name, args, context=None):
@@ -86,11 +92,11 @@ def test_multiple_tool_iterations_with_special_models(model_name, caplog, monkey
     assert any("iteration 2" in msg for msg in messages)
 
 
-class LongChainResponses:
+class LongChainResponses(FakeResponsesBase):
     def __init__(self, chain_length):
+        super().__init__()
         self.chain_length = chain_length
         self.step = 0
-        self._store = {}
 
     def _build_response(self):
         if self.step < self.chain_length:
@@ -98,15 +104,10 @@ class LongChainResponses:
                 id=f"call{self.step}",
                 function=SimpleNamespace(name=f"tool{self.step}", arguments=json.dumps({})),
             )
-            submit = SimpleNamespace(tool_calls=[call])
-            required = SimpleNamespace(submit_tool_outputs=submit)
-            resp = SimpleNamespace(
-                id=f"resp{self.step}", status="requires_action", required_action=required
-            )
+            resp = _requires_action(f"resp{self.step}", call)
         else:
             resp = SimpleNamespace(id=f"resp{self.step}", status="completed", output_text="done")
-        self._store[resp.id] = resp
-        return resp
+        return self._remember(resp)
 
     def create(self, **kwargs):
         return self._build_response()
@@ -115,19 +116,11 @@ class LongChainResponses:
         self.step += 1
         return self._build_response()
 
-    def wait(self, id, **kwargs):
-        return self._store[id]
-
-
-class LongChainClient:
-    def __init__(self, chain_length):
-        self.responses = LongChainResponses(chain_length)
-
 
 @pytest.mark.parametrize("limit, expect_done", [(10, True), (5, False)])
 def test_long_tool_chain(monkeypatch, limit, expect_done, caplog):
     monkeypatch.setenv("MAX_TOOL_LOOPS", str(limit))
-    fake_client = LongChainClient(chain_length=7)
+    fake_client = FakeClient(LongChainResponses(chain_length=7))
     executed = []
 
     def fake_execute(name, args, context=None):
@@ -160,42 +153,27 @@ def test_long_tool_chain(monkeypatch, limit, expect_done, caplog):
         assert any("tool loop limit" in rec.message for rec in caplog.records)
 
 
-class FakeMCPResponses:
+class FakeMCPResponses(FakeResponsesBase):
     def __init__(self):
+        super().__init__()
         self.submissions = []
-        self._store = {}
 
     def create(self, **kwargs):
         call = SimpleNamespace(id="mcp-call1", type="mcp", mcp=SimpleNamespace(method="one"))
-        submit = SimpleNamespace(tool_calls=[call])
-        required = SimpleNamespace(submit_tool_outputs=submit)
-        resp = SimpleNamespace(id="resp1", status="requires_action", required_action=required)
-        self._store[resp.id] = resp
-        return resp
+        return self._remember(_requires_action("resp1", call))
 
     def submit_tool_outputs(self, response_id, tool_outputs, model=None):
         self.submissions.append((response_id, tool_outputs))
         if response_id == "resp1":
             call = SimpleNamespace(id="mcp-call2", type="mcp", mcp=SimpleNamespace(method="two"))
-            submit = SimpleNamespace(tool_calls=[call])
-            required = SimpleNamespace(submit_tool_outputs=submit)
-            resp = SimpleNamespace(id="resp2", status="requires_action", required_action=required)
+            resp = _requires_action("resp2", call)
         else:
             resp = SimpleNamespace(id="resp3", status="completed", output_text="mcp done")
-        self._store[resp.id] = resp
-        return resp
-
-    def wait(self, id, **kwargs):
-        return self._store[id]
-
-
-class FakeMCPClient:
-    def __init__(self):
-        self.responses = FakeMCPResponses()
+        return self._remember(resp)
 
 
 def test_mcp_tool_loop(monkeypatch):
-    fake_client = FakeMCPClient()
+    fake_client = FakeClient(FakeMCPResponses())
     # ensure classic execute_tool_call not used
     from app.services import tools as tools_module
     called = []
@@ -223,18 +201,14 @@ def test_mcp_tool_loop(monkeypatch):
     assert called == []
 
 
-class FakeMixedResponses:
+class FakeMixedResponses(FakeResponsesBase):
     def __init__(self):
+        super().__init__()
         self.submissions = []
-        self._store = {}
 
     def create(self, **kwargs):
         call = SimpleNamespace(id="mcp1", type="mcp", mcp=SimpleNamespace(method="one"))
-        submit = SimpleNamespace(tool_calls=[call])
-        required = SimpleNamespace(submit_tool_outputs=submit)
-        resp = SimpleNamespace(id="resp1", status="requires_action", required_action=required)
-        self._store[resp.id] = resp
-        return resp
+        return self._remember(_requires_action("resp1", call))
 
     def submit_tool_outputs(self, response_id, tool_outputs, model=None):
         self.submissions.append((response_id, tool_outputs))
@@ -242,30 +216,17 @@ class FakeMixedResponses:
             call = SimpleNamespace(
                 id="classic", function=SimpleNamespace(name="list_images", arguments=json.dumps({}))
             )
-            submit = SimpleNamespace(tool_calls=[call])
-            required = SimpleNamespace(submit_tool_outputs=submit)
-            resp = SimpleNamespace(id="resp2", status="requires_action", required_action=required)
+            resp = _requires_action("resp2", call)
         elif response_id == "resp2":
             call = SimpleNamespace(id="mcp2", type="mcp", mcp=SimpleNamespace(method="two"))
-            submit = SimpleNamespace(tool_calls=[call])
-            required = SimpleNamespace(submit_tool_outputs=submit)
-            resp = SimpleNamespace(id="resp3", status="requires_action", required_action=required)
+            resp = _requires_action("resp3", call)
         else:
             resp = SimpleNamespace(id="resp4", status="completed", output_text="mixed done")
-        self._store[resp.id] = resp
-        return resp
-
-    def wait(self, id, **kwargs):
-        return self._store[id]
-
-
-class FakeMixedClient:
-    def __init__(self):
-        self.responses = FakeMixedResponses()
+        return self._remember(resp)
 
 
 def test_mixed_mcp_classic_loop(monkeypatch, caplog):
-    fake_client = FakeMixedClient()
+    fake_client = FakeClient(FakeMixedResponses())
     from app.services import tools as tools_module
 
     executed = []
@@ -300,35 +261,20 @@ def test_mixed_mcp_classic_loop(monkeypatch, caplog):
     assert any("iteration 3" in m for m in messages)
 
 
-class FakeContextResponses:
-    def __init__(self):
-        self._store = {}
-
+class FakeContextResponses(FakeResponsesBase):
     def create(self, **kwargs):
         call = SimpleNamespace(
             id="call1",
             function=SimpleNamespace(name="list_images", arguments=json.dumps({})),
         )
-        submit = SimpleNamespace(tool_calls=[call])
-        required = SimpleNamespace(submit_tool_outputs=submit)
-        resp = SimpleNamespace(id="resp1", status="requires_action", required_action=required)
-        self._store[resp.id] = resp
-        return resp
+        return self._remember(_requires_action("resp1", call))
 
     def submit_tool_outputs(self, response_id, tool_outputs, model=None):
         return SimpleNamespace(id="resp2", status="completed", output_text="ok")
 
-    def wait(self, id, **kwargs):
-        return self._store[id]
-
-
-class FakeContextClient:
-    def __init__(self):
-        self.responses = FakeContextResponses()
-
 
 def test_tool_context_propagated(monkeypatch):
-    fake_client = FakeContextClient()
+    fake_client = FakeClient(FakeContextResponses())
     from app.services import tools as tools_module
 
     received = {}
@@ -375,9 +321,7 @@ class FakeInProgressResponses:
                 id="call-search",
                 function=SimpleNamespace(name="search_web", arguments=json.dumps({"query": "hello"})),
             )
-            submit = SimpleNamespace(tool_calls=[call])
-            required = SimpleNamespace(submit_tool_outputs=submit)
-            return SimpleNamespace(id="resp-initial", status="requires_action", required_action=required)
+            return _requires_action("resp-initial", call)
         if id == "resp-after-submit" and self.stage == 2:
             self.stage = 3
             return SimpleNamespace(id="resp-after-submit", status="completed", output_text="final output")
@@ -388,13 +332,8 @@ class FakeInProgressResponses:
         return SimpleNamespace(id="resp-after-submit", status="in_progress")
 
 
-class FakeInProgressClient:
-    def __init__(self):
-        self.responses = FakeInProgressResponses()
-
-
 def test_in_progress_polling(monkeypatch):
-    fake_client = FakeInProgressClient()
+    fake_client = FakeClient(FakeInProgressResponses())
     from app.services import tools as tools_module
     executed = []
 
@@ -427,13 +366,8 @@ class FakeCompletedResponses:
         return SimpleNamespace(id="r1", status="completed", output_text="done")
 
 
-class FakeCompletedClient:
-    def __init__(self):
-        self.responses = FakeCompletedResponses()
-
-
 def test_no_websearch_when_not_allowed(monkeypatch):
-    fake_client = FakeCompletedClient()
+    fake_client = FakeClient(FakeCompletedResponses())
     from app.services import tools as tools_module
     calls = []
 
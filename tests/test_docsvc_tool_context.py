@@ -1,8 +1,5 @@
-import sys
-import pathlib
 import pytest
 
-sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
 from app.services import tools
 
 
@@ -28,3 +25,75 @@ def test_docsvc_tools_use_context_for_user_id(monkeypatch):
     assert calls[0] == ("POST", "/users/init", None)  # Now uses JSON body instead of path params
     assert calls[1] == ("GET", "/users/images", None)  # Now uses JSON body instead of path params  
     assert calls[2] == ("GET", "/users/templates", None)  # Now uses JSON body instead of path params
+
+
+def test_docsvc_breaker_fails_fast_after_repeated_failures(monkeypatch):
+    monkeypatch.setenv("DOCSVC_BASE_URL", "https://docs.example")
+    breaker = tools._Breaker(threshold=2, cooloff=60.0)
+    monkeypatch.setattr(tools, "_DOCSVC_BREAKERS", {"/users/images": breaker})
+    calls = []
+
+    class FailingSession:
+        def get(self, url, **kwargs):
+            calls.append(url)
+            raise ConnectionError("host down")
+
+    monkeypatch.setattr(tools, "get_http_session", lambda: FailingSession())
+
+    for _ in range(2):
+        assert tools._docsvc_request("GET", "/users/images").startswith("docsvc call failed")
+    result = tools._docsvc_request("GET", "/users/images")
+
+    assert "circuit open" in result
+    assert len(calls) == 2
+
+    # After the cool-off a single probe goes through again
+    breaker.opened_at -= 60.0
+    tools._docsvc_request("GET", "/users/images")
+    assert len(calls) == 3
+    assert breaker.state == "open"
+
+    # Other endpoints keep their own breaker
+    tools._docsvc_request("GET", "/templates/shared")
+    assert len(calls) == 4
+
+
+def test_docsvc_breaker_ignores_plain_server_errors(monkeypatch):
+    monkeypatch.setenv("DOCSVC_BASE_URL", "https://docs.example")
+    monkeypatch.setattr(tools, "_DOCSVC_BREAKERS", {})
+    statuses = []
+
+    class Resp:
+        def __init__(self, status):
+            self.status_code = status
+            self.text = "boom"
+
+        def json(self):
+            raise ValueError
+
+    class Session:
+        def post(self, url, **kwargs):
+            return Resp(statuses.pop(0))
+
+    monkeypatch.setattr(tools, "get_http_session", lambda: Session())
+
+    statuses.extend([500] * 5)
+    for _ in range(5):
+        assert tools._docsvc_request("POST", "/convert").startswith("docsvc error 500")
+    assert tools._docsvc_breaker("/convert").state == "closed"
+
+    statuses.extend([503] * 3)
+    for _ in range(3):
+        tools._docsvc_request("POST", "/convert")
+    assert "circuit open" in tools._docsvc_request("POST", "/convert?blob=x")
+
+
+def test_docsvc_build_url_keeps_literal_paths(monkeypatch):
+    monkeypatch.setenv("DOCSVC_BASE_URL", "docs.example/api/")
+    monkeypatch.setenv("DOCSVC_FUNCTION_KEY", "k")
+    assert tools._docsvc_build_url("/convert/word-to-pdf?blob=u1/{draft}.docx") == (
+        "https://docs.example/api/convert/word-to-pdf?blob=u1/{draft}.docx&code=k"
+    )
+    assert tools._docsvc_build_url("/users/{userId}/init", {"userId": "u1"}) == (
+        "https://docs.example/api/users/u1/init?code=k"
+    )
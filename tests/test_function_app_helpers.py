@@ -0,0 +1,54 @@
+import json
+
+import function_app
+
+
+def test_tool_body_content_passes_small_bodies_through():
+    raw = b'{"items": ["a.png"], "note": "kept as sent"}'
+    assert function_app._tool_body_content(raw) == raw.decode("utf-8")
+
+
+def test_tool_message_content_samples_long_item_lists():
+    data = {"items": [f"image-{i:04d}.png" for i in range(2000)]}
+    content = function_app._tool_message_content(data)
+    parsed = json.loads(content)
+    assert parsed["items"] == data["items"][:function_app._TOOL_CONTENT_SAMPLE_ITEMS]
+    assert parsed["_truncated_total"] == 2000
+
+
+def test_tool_message_content_enforces_byte_limit_without_dropping_items():
+    content = function_app._tool_message_content({"items": ["x" * 9000]})
+    assert "_truncated_total" not in content
+    assert len(content.encode("utf-8")) <= function_app._TOOL_CONTENT_MAX_BYTES
+
+
+def test_responses_call_succeeded_rejects_failed_mcp_calls():
+    from types import SimpleNamespace as NS
+
+    ok = NS(status="completed", output=[NS(type="mcp_call", error=None), NS(type="message")])
+    failed_tool = NS(status="completed", output=[NS(type="mcp_call", error="upstream 503")])
+    incomplete = NS(status="incomplete", output=[])
+    assert function_app._responses_call_succeeded(ok)
+    assert not function_app._responses_call_succeeded(failed_tool)
+    assert not function_app._responses_call_succeeded(incomplete)
+
+
+def test_dumps_falls_back_to_stdlib_for_surrogates_and_int_keys():
+    payload = {"answer": "broken emoji \ud83d", 1: "é"}
+    raw = function_app._dumps(payload)
+    assert isinstance(raw, bytes)
+    assert json.loads(raw) == {"answer": "broken emoji \ud83d", "1": "é"}
+
+
+def test_follow_up_token_cap_skips_reasoning_models(monkeypatch):
+    monkeypatch.delenv("REASONING_MODELS", raising=False)
+    assert function_app._follow_up_token_cap("gpt-5-mini") == {}
+    assert function_app._follow_up_token_cap("gpt-4o") == {"max_tokens": function_app._TOOL_FOLLOW_UP_MAX_TOKENS}
+
+
+def test_docsvc_timeout_defaults_on_empty_or_malformed_setting(monkeypatch):
+    for value in ("", "twenty"):
+        monkeypatch.setenv("DOCSVC_TIMEOUT_SECONDS", value)
+        assert function_app._get_docsvc_timeout_seconds() == 20.0
+    monkeypatch.setenv("DOCSVC_TIMEOUT_SECONDS", "7.5")
+    assert function_app._get_docsvc_timeout_seconds() == 7.5
@@ -28,3 +28,44 @@ def test_neutralize_malformed_unicode_sequences():
         text = msg["content"]
         for pat in bad_patterns:
             assert re.search(pat, text) is None, f"Pattern {pat} still present in '{text}'"
+
+
+def test_double_escape_prefixes_keeps_escaped_backslashes():
+    from app.services.memory import _double_escape_prefixes
+
+    assert _double_escape_prefixes(r"bad \u and \X1") == r"bad \\u and \\X1"
+    assert _double_escape_prefixes(r"kept \\u") == r"kept \\u"
+    assert _double_escape_prefixes("nul\x00 \\x1") == "nul\x00 \\\\x1"
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        # Outputs of the original per-pattern re.sub implementation
+        (r"bad \u12 x", r"bad \\\u12 x"),
+        ("\\x1 \\U00 \\\\\\u12 ok é", "\\\\\\x1 \\\\\\U00 \\\\\\\\\\u12 ok é"),
+        (r"fine é \x41", r"fine é \x41"),
+    ],
+)
+def test_sanitize_text_matches_original_output(raw, expected):
+    from app.services.memory import _sanitize_text_for_cosmos
+
+    assert _sanitize_text_for_cosmos(raw) == expected
+
+
+@pytest.mark.parametrize("prefix", ["", "nul\x00 "])
+def test_double_escape_prefixes_same_result_with_or_without_nul(prefix):
+    from app.services.memory import _double_escape_prefixes
+
+    # Three backslashes: one escaped pair, then an unescaped \u
+    assert _double_escape_prefixes(prefix + "\\\\\\u12") == prefix + "\\\\\\\\u12"
+
+
+@pytest.mark.parametrize("other", ["plain é", "record\x1esep é"])
+def test_sanitize_json_in_place_batched_and_per_string_paths_agree(other):
+    from app.services.memory import _sanitize_json_in_place, _sanitize_text_for_cosmos
+
+    raw = "\\\\\\u12 é"
+    doc = {"a": raw, "b": [other]}
+    _sanitize_json_in_place(doc)
+    assert doc == {"a": _sanitize_text_for_cosmos(raw), "b": [_sanitize_text_for_cosmos(other)]}
@@ -38,3 +38,45 @@ def test_derive_short_title_empty_returns_generic(monkeypatch):
     monkeypatch.setattr(memory.time, "strftime", lambda fmt, _: "2023-07-05 12:34")
     result = _derive_short_title_from_text("")
     assert result == "Conversation 2023-07-05 12:34"
+
+
+def test_enqueued_turns_are_coalesced_per_conversation(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        memory,
+        "_upsert_conversation_turns",
+        lambda user_id, conversation_id, turns: calls.append((user_id, conversation_id, list(turns))),
+    )
+    memory.enqueue_conversation_turn("u1", "c1", "q1", "a1")
+    memory.enqueue_conversation_turn("u1", "c2", "q2", "a2")
+    memory.enqueue_conversation_turn("u1", "c1", "q3", "a3")
+    memory.flush_conversation_turns()
+    assert calls == [
+        ("u1", "c1", [("q1", "a1"), ("q3", "a3")]),
+        ("u1", "c2", [("q2", "a2")]),
+    ]
+
+
+def test_history_read_waits_for_queued_turns(monkeypatch):
+    stored = {}
+
+    def slow_upsert(user_id, conversation_id, turns):
+        memory.time.sleep(0.1)
+        stored[conversation_id] = {"messages": [{"role": "user", "content": u} for u, _ in turns]}
+
+    monkeypatch.setattr(memory, "_upsert_conversation_turns", slow_upsert)
+    monkeypatch.setattr(memory, "get_memory", lambda user_id, conversation_id: stored.get(conversation_id))
+    memory.enqueue_conversation_turn("u1", "c9", "q1", "a1")
+
+    assert memory.get_conversation_messages("u1", "c9") == [{"role": "user", "content": "q1"}]
+    assert ("u1", "c9") not in memory._PENDING_TURNS
+
+
+def test_history_wait_times_out_with_a_warning(monkeypatch, caplog):
+    monkeypatch.setattr(memory, "_PENDING_TURNS_WAIT_SECONDS", 0.01)
+    monkeypatch.setitem(memory._PENDING_TURNS, ("u1", "stuck"), 1)
+
+    with caplog.at_level("WARNING"):
+        assert memory.wait_for_conversation_turns("u1", "stuck") is False
+    assert "history may be incomplete" in caplog.text
+    assert memory.wait_for_conversation_turns("u1", "idle") is True
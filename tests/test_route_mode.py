@@ -1,9 +1,5 @@
-import pathlib
-import sys
-
 import pytest
 
-sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
 from app.services.conversation import route_mode
 
 
@@ -6,7 +6,9 @@ Teste la connectivité et les fonctionnalités de base de SearXNG
 
 import requests
 import json
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlencode
 from typing import Dict, Any, Optional
 
@@ -21,15 +23,33 @@ class SearXNGTester:
         self.session.headers.update({
             'User-Agent': 'SearXNG-Tester/1.0'
         })
+        self._local = threading.local()
+    
+    def _log(self, message: str) -> None:
+        """print(), ou mise en tampon quand la sonde tourne en parallèle des autres"""
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            print(message)
+        else:
+            buffer.append(message)
+    
+    def _run_buffered(self, probe, *args):
+        """Exécute une sonde en gardant ses messages pour les afficher dans l'ordre ensuite"""
+        self._local.buffer = []
+        try:
+            result = probe(*args)
+        finally:
+            lines, self._local.buffer = self._local.buffer, None
+        return result, lines
     
     def test_connectivity(self) -> bool:
         """Teste la connectivité de base à SearXNG"""
         try:
             response = self.session.get(self.base_url, timeout=5)
-            print(f"✅ Connectivité OK - Status: {response.status_code}")
+            self._log(f"✅ Connectivité OK - Status: {response.status_code}")
             return response.status_code == 200
         except requests.exceptions.RequestException as e:
-            print(f"❌ Erreur de connectivité: {e}")
+            self._log(f"❌ Erreur de connectivité: {e}")
             return False
     
     def test_search_endpoint(self, query: str = "test", format: str = "json") -> Optional[Dict[str, Any]]:
@@ -40,30 +60,30 @@ class SearXNGTester:
         }
         
         try:
-            print(f"🔍 Test de recherche: '{query}'")
+            self._log(f"🔍 Test de recherche: '{query}'")
             response = self.session.get(self.search_url, params=params, timeout=10)
             
             if response.status_code == 200:
-                print(f"✅ Recherche réussie - Status: {response.status_code}")
+                self._log(f"✅ Recherche réussie - Status: {response.status_code}")
                 
                 if format == "json":
                     try:
                         data = response.json()
-                        print(f"📊 Résultats trouvés: {len(data.get('results', []))}")
+                        self._log(f"📊 Résultats trouvés: {len(data.get('results', []))}")
                         return data
                     except json.JSONDecodeError as e:
-                        print(f"❌ Erreur de parsing JSON: {e}")
+                        self._log(f"❌ Erreur de parsing JSON: {e}")
                         return None
                 else:
-                    print(f"📄 Réponse reçue (format: {format})")
+                    self._log(f"📄 Réponse reçue (format: {format})")
                     return {"content": response.text}
             else:
-                print(f"❌ Erreur HTTP: {response.status_code}")
-                print(f"📄 Réponse: {response.text[:200]}...")
+                self._log(f"❌ Erreur HTTP: {response.status_code}")
+                self._log(f"📄 Réponse: {response.text[:200]}...")
                 return None
                 
         except requests.exceptions.RequestException as e:
-            print(f"❌ Erreur de requête: {e}")
+            self._log(f"❌ Erreur de requête: {e}")
             return None
     
     def test_search_with_engines(self, query: str = "python", engines: list = None) -> Optional[Dict[str, Any]]:
@@ -78,20 +98,20 @@ class SearXNGTester:
         }
         
         try:
-            print(f"🔍 Test avec moteurs: {engines}")
+            self._log(f"🔍 Test avec moteurs: {engines}")
             response = self.session.get(self.search_url, params=params, timeout=15)
             
             if response.status_code == 200:
                 data = response.json()
-                print(f"✅ Recherche avec moteurs réussie")
-                print(f"📊 Résultats: {len(data.get('results', []))}")
+                self._log(f"✅ Recherche avec moteurs réussie")
+                self._log(f"📊 Résultats: {len(data.get('results', []))}")
                 return data
             else:
-                print(f"❌ Erreur: {response.status_code}")
+                self._log(f"❌ Erreur: {response.status_code}")
                 return None
                 
         except requests.exceptions.RequestException as e:
-            print(f"❌ Erreur: {e}")
+            self._log(f"❌ Erreur: {e}")
             return None
     
     def test_available_engines(self) -> Optional[Dict[str, Any]]:
@@ -99,13 +119,13 @@ class SearXNGTester:
         try:
             response = self.session.get(f"{self.base_url}/preferences", timeout=5)
             if response.status_code == 200:
-                print("✅ Endpoint preferences accessible")
+                self._log("✅ Endpoint preferences accessible")
                 return {"status": "available"}
             else:
-                print(f"❌ Preferences non accessible: {response.status_code}")
+                self._log(f"❌ Preferences non accessible: {response.status_code}")
                 return None
         except requests.exceptions.RequestException as e:
-            print(f"❌ Erreur preferences: {e}")
+            self._log(f"❌ Erreur preferences: {e}")
             return None
     
     def test_health_check(self) -> bool:
@@ -118,17 +138,17 @@ class SearXNGTester:
             if response.status_code == 200:
                 data = response.json()
                 if 'results' in data:
-                    print("✅ Instance SearXNG en bonne santé")
+                    self._log("✅ Instance SearXNG en bonne santé")
                     return True
                 else:
-                    print("⚠️ Réponse inattendue de SearXNG")
+                    self._log("⚠️ Réponse inattendue de SearXNG")
                     return False
             else:
-                print(f"❌ Instance non disponible: {response.status_code}")
+                self._log(f"❌ Instance non disponible: {response.status_code}")
                 return False
                 
         except requests.exceptions.RequestException as e:
-            print(f"❌ Erreur de santé: {e}")
+            self._log(f"❌ Erreur de santé: {e}")
             return False
     
     def run_full_test_suite(self):
@@ -142,35 +162,30 @@ class SearXNGTester:
             print("❌ Impossible de se connecter à SearXNG. Arrêt des tests.")
             return False
         
-        # Test 2: Endpoint preferences
-        print("\n2️⃣ Test des préférences")
-        self.test_available_engines()
-        
-        # Test 3: Recherche simple
-        print("\n3️⃣ Test de recherche simple")
-        result1 = self.test_search_endpoint("Azure Functions")
-        if not result1:
-            print("❌ Échec du test de recherche simple")
-            return False
-        
-        # Test 4: Recherche avec moteurs spécifiques
-        print("\n4️⃣ Test avec moteurs spécifiques")
-        result2 = self.test_search_with_engines("Python programming")
-        if not result2:
-            print("❌ Échec du test avec moteurs spécifiques")
-            return False
-        
-        # Test 5: Recherche en français
-        print("\n5️⃣ Test de recherche en français")
-        result3 = self.test_search_endpoint("développement web")
-        if not result3:
-            print("❌ Échec du test de recherche en français")
-            return False
+        # Tests 2 à 6 indépendants : lancés en parallèle, affichés dans l'ordre
+        probes = [
+            ("2️⃣ Test des préférences", self.test_available_engines, (), None),
+            ("3️⃣ Test de recherche simple", self.test_search_endpoint, ("Azure Functions",),
+             "❌ Échec du test de recherche simple"),
+            ("4️⃣ Test avec moteurs spécifiques", self.test_search_with_engines, ("Python programming",),
+             "❌ Échec du test avec moteurs spécifiques"),
+            ("5️⃣ Test de recherche en français", self.test_search_endpoint, ("développement web",),
+             "❌ Échec du test de recherche en français"),
+            ("6️⃣ Test de santé", self.test_health_check, (), "❌ Échec du test de santé"),
+        ]
+        with ThreadPoolExecutor(max_workers=len(probes)) as executor:
+            futures = [executor.submit(self._run_buffered, probe, *args) for _, probe, args, _ in probes]
         
-        # Test 6: Santé de l'instance
-        print("\n6️⃣ Test de santé")
-        if not self.test_health_check():
-            print("❌ Échec du test de santé")
+        success = True
+        for (title, _, _, failure), future in zip(probes, futures):
+            result, lines = future.result()
+            print(f"\n{title}")
+            for line in lines:
+                print(line)
+            if failure and not result:
+                print(failure)
+                success = False
+        if not success:
             return False
         
         print("\n" + "=" * 50)
@@ -1,13 +1,10 @@
 import os
 import json
+import hashlib
 import sys
 import types
-import pathlib
 from unittest.mock import MagicMock, patch
 
-# Ensure project root on sys.path
-sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
-
 # Stub Azure modules if they are not installed
 # This allows importing storage module without azure dependencies.
 if 'azure' not in sys.modules:
@@ -37,6 +34,7 @@ if 'azure' not in sys.modules:
     sys.modules['azure.storage.queue'] = queue_mod
     sys.modules['azure.storage.blob'] = blob_mod
 
+import app.services.storage as storage
 from app.services.storage import (
     get_storage_clients,
     upload_job_blob,
@@ -48,16 +46,22 @@ from app.services.storage import (
 
 def test_get_storage_clients_uses_env_and_calls_from_connection_string():
     conn_str = "DefaultEndpointsProtocol=https;AccountName=test;AccountKey=key;"
+    storage._queue_client.cache_clear()
+    storage._blob_service.cache_clear()
     with patch.dict(os.environ, {"AzureWebJobsStorage": conn_str}):
-        with patch("app.services.storage.QueueClient.from_connection_string") as queue_from_cs, \
-             patch("app.services.storage.BlobServiceClient.from_connection_string") as blob_from_cs:
+        with patch("app.services.storage._QueueClient") as queue_cls, \
+             patch("app.services.storage._BlobServiceClient") as blob_cls:
+            queue_from_cs = queue_cls.from_connection_string
+            blob_from_cs = blob_cls.from_connection_string
             queue_from_cs.return_value = "queue"
             blob_from_cs.return_value = "blob"
 
             result = get_storage_clients("testqueue")
+            again = get_storage_clients("testqueue")
 
             queue_from_cs.assert_called_once_with(conn_str, queue_name="testqueue")
             blob_from_cs.assert_called_once_with(conn_str)
+            assert again == result
             assert result["queue"] == "queue"
             assert result["blob"] == "blob"
             assert result["container"] == os.getenv("MCP_JOBS_CONTAINER", "jobs")
@@ -71,7 +75,26 @@ def test_upload_job_blob_serializes_json():
     upload_job_blob(blob_service, "cont", "123", payload)
 
     blob_service.get_blob_client.assert_called_once_with(container="cont", blob="123.json")
-    blob_client.upload_blob.assert_called_once_with(json.dumps(payload, ensure_ascii=False), overwrite=True)
+    blob_client.upload_blob.assert_called_once()
+    args, kwargs = blob_client.upload_blob.call_args
+    assert json.loads(args[0]) == payload
+    assert kwargs["overwrite"] is True
+    assert kwargs["metadata"] == {"content_hash": hashlib.blake2b(args[0], digest_size=16).hexdigest()}
+
+
+def test_upload_job_blob_skips_unchanged_large_payload():
+    blob_service = MagicMock()
+    blob_client = blob_service.get_blob_client.return_value
+    payload = {"result": "x" * 100_000, "status": "done"}
+
+    upload_job_blob(blob_service, "cont", "123", payload)
+    metadata = blob_client.upload_blob.call_args.kwargs["metadata"]
+    blob_client.get_blob_properties.return_value.metadata = metadata
+    blob_client.upload_blob.reset_mock()
+
+    upload_job_blob(blob_service, "cont", "123", {"status": "done", "result": "x" * 100_000})
+
+    blob_client.upload_blob.assert_not_called()
 
 
 def test_get_job_blob_deserializes_json():
@@ -80,7 +103,7 @@ def test_get_job_blob_deserializes_json():
     payload = {"message": "salut"}
     blob_client.exists.return_value = True
     download = MagicMock()
-    download.readall.return_value = json.dumps(payload).encode("utf-8")
+    download.readinto.side_effect = lambda stream: stream.write(json.dumps(payload).encode("utf-8"))
     blob_client.download_blob.return_value = download
 
     result = get_job_blob(blob_service, "cont", "456")
@@ -99,7 +122,11 @@ def test_upload_sidecar_request_serializes_json():
     upload_sidecar_request(blob_service, "cont", "789", body)
 
     blob_service.get_blob_client.assert_called_once_with(container="cont", blob="789.req.json")
-    blob_client.upload_blob.assert_called_once_with(json.dumps(body, ensure_ascii=False), overwrite=True)
+    blob_client.upload_blob.assert_called_once()
+    args, kwargs = blob_client.upload_blob.call_args
+    assert json.loads(args[0]) == body
+    assert kwargs["overwrite"] is True
+    assert kwargs["metadata"] == {"content_hash": hashlib.blake2b(args[0], digest_size=16).hexdigest()}
 
 
 def test_get_sidecar_request_deserializes_json():
@@ -108,7 +135,7 @@ def test_get_sidecar_request_deserializes_json():
     body = {"sidecar": "info"}
     blob_client.exists.return_value = True
     download = MagicMock()
-    download.readall.return_value = json.dumps(body).encode("utf-8")
+    download.readinto.side_effect = lambda stream: stream.write(json.dumps(body).encode("utf-8"))
     blob_client.download_blob.return_value = download
 
     result = get_sidecar_request(blob_service, "cont", "321")
@@ -117,3 +144,14 @@ def test_get_sidecar_request_deserializes_json():
     blob_client.exists.assert_called_once()
     blob_client.download_blob.assert_called_once()
     assert result == body
+
+
+def test_upload_job_blob_accepts_lone_surrogates_and_int_keys():
+    blob_service = MagicMock()
+    blob_client = blob_service.get_blob_client.return_value
+    payload = {"text": "broken \ud83d", 1: "é"}
+
+    upload_job_blob(blob_service, "cont", "123", payload)
+
+    args, _ = blob_client.upload_blob.call_args
+    assert json.loads(args[0]) == {"text": "broken \ud83d", "1": "é"}
@@ -1,4 +1,4 @@
-from app.services.tools import get_builtin_tools_config
+from app.services.tools import get_builtin_tools_config, get_http_session
 
 
 def _has_search_web(tools):
@@ -20,3 +20,15 @@ def test_search_web_present_when_backend_configured(monkeypatch):
     monkeypatch.setenv("WEBSEARCH_FUNCTION_KEY", "secret")
     tools = get_builtin_tools_config()
     assert _has_search_web(tools)
+
+
+def test_http_session_is_shared_with_pooled_adapter():
+    session = get_http_session()
+    assert get_http_session() is session
+    adapter = session.get_adapter("https://example.com")
+    assert adapter._pool_maxsize == 20
+    assert adapter.max_retries.total == 3
+    assert adapter.max_retries.read == 0
+    assert 503 in adapter.max_retries.status_forcelist
+    assert adapter.max_retries.is_retry("GET", 503)
+    assert not adapter.max_retries.is_retry("POST", 503)